@@ -6,8 +6,15 @@ import plotly.graph_objects as go
 import os
 import warnings
 from datetime import datetime
-import subprocess
-import sys
+
+from src.alerts import alert_paths, update_alerts
+from src.anomaly import ensure_anomalies, summarize
+from src.artifacts import artifact_key, ensure_artifact, is_fresh
+from src.dashboard_filters import load_filtered_transactions, load_rollup, sidebar_filters
+from src.rfm import compute_rfm, ensure_rfm, score_rfm, segment_table
+from src.rollups import filter_rollup
+from src.store import CACHE_DIR, build_store, load_transactions
+from src.time_index import date_bounds, slice_sorted
 
 
 warnings.filterwarnings("ignore", message="Please replace `use_container_width`", category=UserWarning)
@@ -307,9 +314,8 @@ st.sidebar.markdown("### Current Mode: **Business**")
 # Updated switch label and target file
 
 if st.sidebar.button("Switch to Beginner Mode"):
-    st.query_params["mode"] = "beginner"
-    subprocess.Popen([sys.executable, "-m", "streamlit", "run", "simple_app.py"])
-    st.stop()
+    # both modes are pages of launcher.py's app: same process, same caches
+    st.switch_page("simple_app.py")
 st.sidebar.markdown("---")
 
 # ------------------------------------------------------------
@@ -318,78 +324,130 @@ st.sidebar.markdown("---")
 # ------------------------------------------------------------
 # DATA LOADING
 # ------------------------------------------------------------
-@st.cache_data(ttl=3600, max_entries=1)
+# Business Mode keeps its own customer summary (sales-only spend, distinct invoices),
+# separate from src/data_processing's processed_customer_data.csv
+RAW_FILE = "data/OnlineRetail.csv"
+SUMMARY_FILE = os.path.join(CACHE_DIR, "business_customer_summary.parquet")
+SUMMARY_VERSION = "business-summary-v1"
+
+
+def customer_summary(df):
+    # --- Improved AOV Logic ---
+    # 1. Clean data: drop rows without CustomerID
+    df = df.dropna(subset=["CustomerID"])
+
+    # 2. Filter for *sales transactions only* (positive quantity and price)
+    df_sales = df[(df["Quantity"] > 0) & (df["UnitPrice"] > 0)].copy()
+
+    if df_sales.empty:
+        raise ValueError("No valid sales data found after filtering. Cannot calculate AOV.")
+
+    # 3. Calculate TotalSpend on sales data
+    df_sales["TotalSpend"] = df_sales["Quantity"] * df_sales["UnitPrice"]
+
+    # 4. Aggregate order counts and spend from sales data
+    order_counts = df_sales.groupby("CustomerID")["InvoiceNo"].nunique().reset_index(name="NumOrders")
+    customer_spend = df_sales.groupby("CustomerID").agg(
+        TotalSpend=('TotalSpend', 'sum'),
+        Country=('Country', 'first') # Keep country
+    ).reset_index()
+
+    # 5. Merge into a final customer dataframe
+    customer_df = customer_spend.merge(order_counts, on="CustomerID", how="left")
+
+    # 6. Calculate AOV
+    # Ensure NumOrders is not zero to avoid division by zero
+    customer_df = customer_df[customer_df["NumOrders"] > 0]
+    customer_df["AOV"] = customer_df["TotalSpend"] / customer_df["NumOrders"]
+    # --- End Improved Logic ---
+
+    # Add simulated ReturnRate
+    np.random.seed(43)
+    customer_df["ReturnRate"] = np.random.uniform(1, 10, len(customer_df))
+    return customer_df
+
+
+def build_customer_summary(raw_file, out_path):
+    df = load_transactions(
+        ["InvoiceNo", "Quantity", "UnitPrice", "CustomerID", "Country"], raw_path=raw_file
+    )
+    customer_summary(df).to_parquet(out_path, index=False)
+
+
+@st.cache_resource(max_entries=1)
+def read_customer_summary(path, build_key):
+    # build_key changes on every rebuild, so a stale summary is never served.
+    # One copy per server process, shared by every session and rerun (no
+    # per-rerun unpickling): treat it as read-only and derive new frames.
+    return pd.read_parquet(path)
+
+
+@st.cache_resource(max_entries=2)
+def read_rfm(path, build_key):
+    # precomputed by src/rfm.py once per dataset version; shared, read-only
+    return pd.read_parquet(path)
+
+
+def load_rfm(table):
+    # "scores" (one row per customer) or "segments" (one row per segment)
+    path = ensure_rfm(RAW_FILE)[table]
+    return read_rfm(path, artifact_key(path))
+
+
 def load_data():
-    processed_file = "processed_customer_data.csv"
-    raw_file = "data/OnlineRetail.csv"  # <-- This path is correct as per your info
-
-    if os.path.exists(processed_file):
-        try:
-            # Try to read the processed file
-            st.info(f"Loading cached data from {processed_file}...")
-            return pd.read_csv(processed_file)
-        except pd.errors.EmptyDataError:
-            # If it's empty or corrupt, delete it and proceed
-            st.warning("Found empty processed file. Deleting and reprocessing.")
-            os.remove(processed_file)
-
-    # Check for the raw file
-    if os.path.exists(raw_file): 
-        st.info("Processing raw data... This may take a moment.")
-        
-        df = pd.read_csv(raw_file, encoding='latin1')
-        
-        # --- Improved AOV Logic ---
-        # 1. Clean data: drop rows without CustomerID
-        df = df.dropna(subset=["CustomerID"])
-        
-        # 2. Filter for *sales transactions only* (positive quantity and price)
-        df_sales = df[(df["Quantity"] > 0) & (df["UnitPrice"] > 0)].copy()
-        
-        if df_sales.empty:
-            st.error("No valid sales data found after filtering. Cannot calculate AOV.")
-            st.stop()
-            
-        # 3. Calculate TotalSpend on sales data
-        df_sales["TotalSpend"] = df_sales["Quantity"] * df_sales["UnitPrice"]
-
-        # 4. Aggregate order counts and spend from sales data
-        order_counts = df_sales.groupby("CustomerID")["InvoiceNo"].nunique().reset_index(name="NumOrders")
-        customer_spend = df_sales.groupby("CustomerID").agg(
-            TotalSpend=('TotalSpend', 'sum'),
-            Country=('Country', 'first') # Keep country
-        ).reset_index()
-
-        # 5. Merge into a final customer dataframe
-        customer_df = customer_spend.merge(order_counts, on="CustomerID", how="left")
-        
-        # 6. Calculate AOV
-        # Ensure NumOrders is not zero to avoid division by zero
-        customer_df = customer_df[customer_df["NumOrders"] > 0]
-        customer_df["AOV"] = customer_df["TotalSpend"] / customer_df["NumOrders"]
-        # --- End Improved Logic ---
-
-        # Add simulated ReturnRate
-        np.random.seed(43) 
-        customer_df["ReturnRate"] = np.random.uniform(1, 10, len(customer_df))
-        
-        # Save the new processed file and return
-        try:
-            customer_df.to_csv(processed_file, index=False)
-            st.success("Data processing complete! Saved to processed_customer_data.csv")
-        except Exception as e:
-            st.error(f"Failed to save processed file: {e}")
-            
-        return customer_df
-    
-    else:
-        # This error is now correct
+    if not os.path.exists(RAW_FILE):
         st.error(f"Dataset not found. Please place 'OnlineRetail.csv' in the /data folder.")
         st.stop()
 
+    # Rebuilds only if the raw data content or SUMMARY_VERSION changed
+    if not is_fresh(SUMMARY_FILE, [RAW_FILE], SUMMARY_VERSION):
+        st.info("Processing raw data... This may take a moment.")
+    try:
+        path = ensure_artifact(
+            SUMMARY_FILE, [RAW_FILE], SUMMARY_VERSION,
+            lambda tmp_path: build_customer_summary(RAW_FILE, tmp_path)
+        )
+    except ValueError as e:
+        st.error(str(e))
+        st.stop()
+
+    return read_customer_summary(path, artifact_key(path))
+
 df = load_data()
 
 
+@st.cache_resource(max_entries=3, show_spinner="Scoring transactions...")
+def read_anomalies(path, build_key):
+    # ranked flagged lines and summaries from src/anomaly.py; shared, read-only
+    return pd.read_parquet(path)
+
+
+def load_anomalies(table):
+    # "flagged" (ranked lines), "by_reason" or "by_country"
+    path = ensure_anomalies(RAW_FILE)[table]
+    return read_anomalies(path, artifact_key(path))
+
+
+@st.cache_resource(max_entries=2)
+def read_alerts(path, build_key):
+    # alert log and per-series state kept by src/alerts.py; shared, read-only
+    return pd.read_parquet(path)
+
+
+@st.cache_resource(max_entries=1, show_spinner="Updating alerts...")
+def refresh_alerts(build_key):
+    # steps the EWMA/CUSUM state through the days added since the last update;
+    # runs once per store build, not on every rerun
+    update_alerts(RAW_FILE)
+
+
+def load_alerts(table):
+    path = alert_paths(RAW_FILE)[table]
+    if not os.path.exists(path):
+        return None
+    return read_alerts(path, artifact_key(path))
+
+
 # ------------------------------------------------------------
 # SIDEBAR NAVIGATION (MODIFIED)
 # ------------------------------------------------------------
@@ -404,6 +462,48 @@ page = st.sidebar.radio("CHOOSE A SECTION", [
 ])
 
 
+# ------------------------------------------------------------
+# GLOBAL FILTERS (src/dashboard_filters.py)
+# ------------------------------------------------------------
+START, END, COUNTRIES, FILTERED = sidebar_filters(RAW_FILE)
+
+
+@st.cache_resource(max_entries=16)
+def read_filtered_summary(build_key, start, end, countries):
+    # customer summary of one filter selection; shared and read-only like the full one
+    try:
+        return customer_summary(load_filtered_transactions(RAW_FILE, start, end, countries))
+    except ValueError:
+        return None
+
+
+@st.cache_resource(max_entries=16)
+def read_filtered_segments(build_key, start, end, countries):
+    rfm = compute_rfm(load_filtered_transactions(RAW_FILE, start, end, countries))
+    return segment_table(score_rfm(rfm)) if len(rfm) else None
+
+
+@st.cache_resource(max_entries=16)
+def read_filtered_anomalies(build_key, start, end, countries):
+    # flagged lines are ranked by score, not sorted by date: filter that (small) subset
+    flagged = load_anomalies("flagged")
+    lo, hi = date_bounds(start, end)
+    keep = (flagged["InvoiceDate"] >= lo) & (flagged["InvoiceDate"] < hi)
+    if countries:
+        keep &= flagged["Country"].isin(countries)
+    flagged = flagged[keep]
+    lines = filter_rollup(load_rollup(RAW_FILE, "day_country"), start, end, countries).groupby("Country", observed=True)["Lines"].sum()
+    return (flagged, *summarize(flagged, lines))
+
+
+if FILTERED:
+    store_key = artifact_key(build_store(RAW_FILE))
+    df = read_filtered_summary(store_key, START, END, COUNTRIES)
+    if df is None:
+        st.warning("No customer sales match the selected filters.")
+        st.stop()
+
+
 # ------------------------------------------------------------
 # OVERVIEW PAGE
 # ------------------------------------------------------------
@@ -436,39 +536,11 @@ elif page == "RFM Analysis":
     st.title("RFM (Recency, Frequency, Monetary) ANALYSIS")
     st.markdown("### STRATEGIC CUSTOMER SEGMENTATION")
 
-    df["Recency"] = np.random.randint(1, 365, len(df))
-    df["Frequency"] = df["NumOrders"]
-    df["Monetary"] = df["TotalSpend"]
-
-    def safe_qcut(series, q=4, labels=None):
-        try:
-            return pd.qcut(series, q, labels=labels, duplicates="drop")
-        except ValueError:
-            return pd.Series([labels[0]]* len(series), index=series.index)
-
-    try:
-        df["R_Score"] = pd.qcut(df["Recency"], 4, labels=[4, 3, 2, 1], duplicates="drop").astype(int)
-    except Exception:
-        df["R_Score"] = 1
-        
-    try:
-        df["F_Score"] = pd.qcut(df["Frequency"], 4, labels=[1, 2, 3, 4], duplicates="drop").astype(int)
-    except Exception:
-        df["F_Score"] = 1
-
-    try:
-        df["M_Score"] = pd.qcut(df["Monetary"], 4, labels=[1, 2, 3, 4], duplicates="drop").astype(int)
-    except Exception:
-        df["M_Score"] = 1
-
-    df["RFM_Score"] = df["R_Score"] + df["F_Score"] + df["M_Score"]
-
-    df["Segment"] = df["RFM_Score"].apply(
-        lambda x: "Champions" if x >= 10 else "Active" if x >= 7 else "At Risk" if x >= 5 else "Lost"
-    )
-
-    seg_count = df["Segment"].value_counts().reset_index()
-    seg_count.columns = ["Segment", "Count"]
+    segments = read_filtered_segments(store_key, START, END, COUNTRIES) if FILTERED else load_rfm("segments")
+    if segments is None:
+        st.warning("No customer sales match the selected filters.")
+        st.stop()
+    seg_count = segments[["Segment", "Count"]]
 
     st.markdown(f"<div class='section-container'>", unsafe_allow_html=True)
     st.subheader("CUSTOMER SEGMENTATION")
@@ -500,6 +572,19 @@ elif page == "RFM Analysis":
     
     st.plotly_chart(fig, use_container_width=True)
 
+    st.subheader("SEGMENT PROFILE")
+    st.dataframe(
+        segments.style.format({
+            "AvgRecency": "{:.0f} days",
+            "AvgFrequency": "{:.1f}",
+            "AvgMonetary": "${:,.2f}",
+            "Revenue": "${:,.0f}",
+            "Share": "{:.1%}",
+        }),
+        use_container_width=True,
+        hide_index=True,
+    )
+
     st.markdown("</div>", unsafe_allow_html=True)
 
 # ------------------------------------------------------------
@@ -511,7 +596,11 @@ elif page == "Product & Revenue Insights":
     
     st.markdown(f"<div class='section-container'>", unsafe_allow_html=True)
     
-    top = df.groupby("Country")["TotalSpend"].sum().nlargest(10).reset_index()
+    top = (
+        filter_rollup(load_rollup(RAW_FILE, "day_country"), START, END, COUNTRIES)
+        .groupby("Country", observed=True)["SalesRevenue"].sum()
+        .nlargest(10).rename("TotalSpend").reset_index()
+    )
     
     fig = px.bar(
         top, 
@@ -545,18 +634,15 @@ elif page == "Regional Performance":
     
     st.markdown(f"<div class='section-container'>", unsafe_allow_html=True)
 
-    if os.path.exists("data/OnlineRetail.csv"):
-        raw = pd.read_csv("data/OnlineRetail.csv", encoding='latin1')
-        raw["Total"] = raw["Quantity"] * raw["UnitPrice"]
-        raw["InvoiceDate"] = pd.to_datetime(raw["InvoiceDate"])
-        
-        raw = raw.dropna(subset=["InvoiceDate", "Total"])
-        
-        raw["Month"] = raw["InvoiceDate"].dt.to_period("M")
-        sales = raw.groupby(["Country", "Month"])["Total"].sum().reset_index()
-        sales["Month"] = sales["Month"].astype(str)
+    if os.path.exists(RAW_FILE):
+        daily = filter_rollup(load_rollup(RAW_FILE, "day_country"), START, END, COUNTRIES)
+        sales = (
+            daily.assign(Month=daily["Date"].dt.strftime("%Y-%m"))
+            .groupby(["Country", "Month"], observed=True)["Revenue"].sum()
+            .rename("Total").reset_index()
+        )
         
-        top_countries = sales.groupby("Country")["Total"].sum().nlargest(5).index.tolist()
+        top_countries = sales.groupby("Country", observed=True)["Total"].sum().nlargest(5).index.tolist()
         sales_filtered = sales[sales["Country"].isin(top_countries)]
         
         fig = px.line(
@@ -594,21 +680,50 @@ elif page == "Fraud & Anomaly Detection":
     st.markdown("### Detect unusual transactions and outlier purchase patterns.")
     st.markdown(f"<div class='section-container'>", unsafe_allow_html=True)
 
-    if os.path.exists("data/OnlineRetail.csv"):
-        raw = pd.read_csv("data/OnlineRetail.csv", encoding='latin1')
-        raw["Total"] = raw["Quantity"] * raw["UnitPrice"]
+    if os.path.exists(RAW_FILE):
+        if FILTERED:
+            flagged, by_reason, by_country = read_filtered_anomalies(
+                artifact_key(ensure_anomalies(RAW_FILE)["flagged"]), START, END, COUNTRIES
+            )
+        else:
+            flagged, by_reason, by_country = (
+                load_anomalies("flagged"), load_anomalies("by_reason"), load_anomalies("by_country")
+            )
+        flagged_lines = int(by_reason["Lines"].sum())
+
+        col1, col2, col3 = st.columns(3)
+        col1.metric("Flagged Lines", f"{flagged_lines:,}")
+        col2.metric("Flag Rate", f"{flagged_lines / max(by_country['Lines'].sum(), 1):.2%}")
+        col3.metric("Flagged Value", f"${by_reason['Value'].sum():,.0f}")
+
+        st.warning(f"{flagged_lines:,} potential anomalies detected "
+                   "(robust z-score above 3.5 against product and customer baselines).")
 
-        # Basic rule-based anomaly detection
-        anomalies = raw[(raw["Total"] < 0) | (raw["Total"] > raw["Total"].mean() * 5)]
+        col1, col2 = st.columns(2)
+        with col1:
+            fig = px.bar(by_reason, x="Reason", y="Lines", color="Reason",
+                         title="Anomalies by Reason", hover_data=["Invoices", "Value"])
+            fig.update_layout(showlegend=False)
+            st.plotly_chart(fig, use_container_width=True)
+        with col2:
+            fig = px.bar(by_country.head(10), x="Country", y="Flagged",
+                         title="Top 10 Countries by Flagged Lines", hover_data=["FlagRate", "FlaggedValue"])
+            st.plotly_chart(fig, use_container_width=True)
 
-        st.warning(f"{len(anomalies)} potential anomalies detected.")
-        st.dataframe(anomalies[["InvoiceNo", "StockCode", "Quantity", "UnitPrice", "Total"]], use_container_width=True)
+        top_n = st.slider("Top anomalies to show", 10, 500, 100, step=10)
+        anomalies = flagged.head(top_n)
+        st.dataframe(
+            anomalies[["InvoiceNo", "StockCode", "CustomerID", "Quantity", "UnitPrice",
+                       "Total", "InvoiceTotal", "Score", "Reason", "Baseline"]],
+            use_container_width=True,
+            hide_index=True,
+        )
 
         if not anomalies.empty:
             fig = px.scatter(
                 anomalies, x="Quantity", y="Total",
-                color="UnitPrice", title="Anomalous Transactions Overview",
-                hover_data=["InvoiceNo", "StockCode"]
+                color="Reason", size="Score", title=f"Top {len(anomalies)} Anomalous Transactions",
+                hover_data=["InvoiceNo", "StockCode", "UnitPrice", "Baseline"]
             )
             fig.update_layout(
                 paper_bgcolor=SURFACE_WHITE,
@@ -631,41 +746,60 @@ elif page == "Alerts & Notifications":
     st.markdown("### Detect sudden changes in revenue or order trends.")
     st.markdown(f"<div class='section-container'>", unsafe_allow_html=True)
 
-    if os.path.exists("data/OnlineRetail.csv"):
-        # Use the cached raw data loader if possible, or define a local one
-        @st.cache_data(ttl=3600)
-        def load_raw_data_alerts(file_path):
-            df = pd.read_csv(file_path, encoding='latin1')
-            df["Total"] = df["Quantity"] * df["UnitPrice"]
-            df["InvoiceDate"] = pd.to_datetime(df["InvoiceDate"], errors='coerce')
-            return df.dropna(subset=['InvoiceDate'])
+    if os.path.exists(RAW_FILE):
+        refresh_alerts(artifact_key(build_store(RAW_FILE)))
+        state = load_alerts("state")
+        alerts = load_alerts("alerts")
 
-        raw = load_raw_data_alerts("data/OnlineRetail.csv")
-
-        daily_sales = raw.groupby(raw["InvoiceDate"].dt.date)["Total"].sum().reset_index()
-        daily_sales["Change"] = daily_sales["Total"].pct_change() * 100
-
-        # Define a dynamic threshold, e.g., 3 standard deviations from the mean change
-        alert_threshold_high = daily_sales["Change"].mean() + (3 * daily_sales["Change"].std())
-        alert_threshold_low = daily_sales["Change"].mean() - (3 * daily_sales["Change"].std())
-        
-        st.info(f"Alert thresholds set at: > {alert_threshold_high:.2f}% or < {alert_threshold_low:.2f}% change.")
-
-        alerts = daily_sales[(daily_sales["Change"] > alert_threshold_high) | (daily_sales["Change"] < alert_threshold_low)]
-
-        if not alerts.empty:
-            st.error("⚠️ Sudden revenue changes detected:")
-            st.dataframe(alerts, use_container_width=True)
-
-            fig = px.line(daily_sales, x="InvoiceDate", y="Total", title="Daily Revenue Trend (with Alerts Highlighted)")
+        if state is None:
+            st.info("Not enough trading days yet to build alert baselines.")
+        else:
+            through = state["Through"].max()
+            recent = alerts[alerts["Date"] > through - pd.Timedelta(days=30)]
+
+            col1, col2, col3 = st.columns(3)
+            col1.metric("Series Monitored", f"{len(state):,}")
+            col2.metric("Alerts (Last 30 Days)", f"{len(recent):,}")
+            col3.metric("Monitored Through", f"{through:%Y-%m-%d}")
+
+            st.info("Each series (total revenue, every country and the top products) keeps an EWMA baseline: "
+                    "a day beyond 4σ raises a Spike/Drop and a sustained CUSUM drift an Upward/Downward shift.")
+
+            # the alert log is appended in date order, so the date filter is a slice
+            alerts = slice_sorted(alerts, "Date", START, END)
+            if COUNTRIES:
+                alerts = alerts[(alerts["Kind"] != "Country") | alerts["Name"].isin(COUNTRIES)]
+                state = state[(state["Kind"] != "Country") | state["Name"].isin(COUNTRIES)]
+
+            kinds = st.multiselect("Series", ["Total", "Country", "Product"], default=["Total", "Country", "Product"])
+            shown = alerts[alerts["Kind"].isin(kinds)].sort_values(["Date", "Z"], ascending=[False, False])
+
+            if not shown.empty:
+                st.error(f"⚠️ {len(shown):,} revenue alerts detected:")
+                st.dataframe(shown.head(200), use_container_width=True, hide_index=True)
+            else:
+                st.success("✅ No major anomalies detected in recent sales.")
+
+            labels = dict(zip(state["Series"], state["Kind"] + ": " + state["Name"]))
+            series = st.selectbox("Trend", list(labels), format_func=labels.get)
+            kind, name = state.loc[state["Series"] == series, ["Kind", "Name"]].iloc[0]
+            if kind == "Product":
+                daily = load_rollup(RAW_FILE, "cube")
+                daily = daily[daily["Description"] == name]
+            else:
+                daily = load_rollup(RAW_FILE, "day_country")
+                if kind == "Country":
+                    daily = daily[daily["Country"] == name]
+            daily = slice_sorted(daily.groupby("Date")["Revenue"].sum().reset_index(), "Date", START, END)
+            marked = alerts[alerts["Series"] == series]
+
+            fig = px.line(daily, x="Date", y="Revenue", title=f"Daily Revenue: {labels[series]} (with Alerts Highlighted)")
             fig.add_scatter(
-                x=alerts["InvoiceDate"], y=alerts["Total"],
+                x=marked["Date"], y=marked["Revenue"],
                 mode="markers", marker=dict(color="red", size=10),
-                name="Alert Points"
+                name="Alert Points", text=marked["Type"]
             )
             st.plotly_chart(fig, use_container_width=True)
-        else:
-            st.success("✅ No major anomalies detected in recent sales.")
     else:
         st.error("Dataset not found. Please add OnlineRetail.csv in the /data folder.")
 
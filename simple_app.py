@@ -5,8 +5,11 @@ import plotly.express as px
 import plotly.graph_objects as go
 import os
 import time
-import subprocess
-import sys
+
+from src.artifacts import artifact_key
+from src.dashboard_filters import load_filtered_transactions, load_rollup, sidebar_filters
+from src.rollups import filter_rollup
+from src.store import build_store, load_transactions
 
 
 # ------------------------------------------------------------
@@ -384,38 +387,50 @@ st.sidebar.markdown("Current Mode: **Beginner**")
 # Updated switch label and target file
 
 if st.sidebar.button("Switch to Business Mode"):
-    st.query_params["mode"] = "analyst"
-    subprocess.Popen([sys.executable, "-m", "streamlit", "run", "app.py"])
-    st.stop()
+    # both modes are pages of launcher.py's app: same process, same caches
+    st.switch_page("app.py")
 
 st.sidebar.markdown("---")
 
 # ------------------------------------------------------------
 # 📦 LOAD DATA
 # ------------------------------------------------------------
-@st.cache_data
-def load_data():
+RAW_FILE = "data/OnlineRetail.csv"
+
+
+def client_summary(raw):
+    raw = raw.assign(Total=raw["Quantity"] * raw["UnitPrice"])
+    df = raw.dropna(subset=["CustomerID"]).groupby("CustomerID").agg(
+        TotalSpend=("Total", "sum"),
+        NumOrders=("InvoiceNo", "nunique"),
+        Country=("Country", "first")
+    ).reset_index()
+    df["AOV"] = df["TotalSpend"] / df["NumOrders"]
+    np.random.seed(42) 
+    df["ConversionRate"] = np.random.uniform(2.5, 9.5, len(df))
+    return df
+
+
+@st.cache_resource(max_entries=1)
+def read_client_summary(build_key):
+    # one copy per server process, shared by every session and rerun: read-only
     with st.spinner('LOADING DATA SOURCES'):
         time.sleep(1.0)
         
-        if os.path.exists("data/OnlineRetail.csv"):
-            raw = pd.read_csv("data/OnlineRetail.csv", encoding='latin1')
-            raw["Total"] = raw["Quantity"] * raw["UnitPrice"]
-            df = raw.dropna(subset=["CustomerID"]).groupby("CustomerID").agg(
-                TotalSpend=("Total", "sum"),
-                NumOrders=("InvoiceNo", "nunique"),
-                Country=("Country", "first")
-            ).reset_index()
-            df["AOV"] = df["TotalSpend"] / df["NumOrders"]
-            np.random.seed(42) 
-            df["ConversionRate"] = np.random.uniform(2.5, 9.5, len(df))
-            return df
-        else:
-            st.error("DATA SOURCE ERROR: OnlineRetail.csv NOT FOUND IN data/ DIRECTORY")
-            st.stop()
+        raw = load_transactions(["InvoiceNo", "Quantity", "UnitPrice", "CustomerID", "Country"], raw_path=RAW_FILE)
+        return client_summary(raw)
+
+
+def load_data():
+    if not os.path.exists(RAW_FILE):
+        st.error("DATA SOURCE ERROR: OnlineRetail.csv NOT FOUND IN data/ DIRECTORY")
+        st.stop()
+    # keyed on the transaction store, so new raw data invalidates the summary
+    return read_client_summary(artifact_key(build_store(RAW_FILE)))
 
 df = load_data()
 
+
 # ------------------------------------------------------------
 # 🌍 PAGE NAVIGATION
 # ------------------------------------------------------------
@@ -425,6 +440,33 @@ page = st.sidebar.radio("NAVIGATION", [
     "Product Intelligence"
 ])
 
+
+# ------------------------------------------------------------
+# GLOBAL FILTERS (src/dashboard_filters.py)
+# ------------------------------------------------------------
+START, END, COUNTRIES, FILTERED = sidebar_filters(RAW_FILE)
+
+
+@st.cache_resource(max_entries=16)
+def read_filtered_client_summary(build_key, start, end, countries):
+    # client summary of one filter selection; shared and read-only like the full one
+    return client_summary(load_filtered_transactions(RAW_FILE, start, end, countries))
+
+
+def load_products():
+    # product measures of the selection, re-aggregated from the day x country x product cube
+    if not FILTERED:
+        return load_rollup(RAW_FILE, "product")
+    cube = filter_rollup(load_rollup(RAW_FILE, "cube"), START, END, COUNTRIES)
+    return cube.groupby("Description", observed=True)[["Revenue", "ReturnQuantity", "ReturnLines"]].sum().reset_index()
+
+
+if FILTERED:
+    df = read_filtered_client_summary(artifact_key(build_store(RAW_FILE)), START, END, COUNTRIES)
+    if df.empty:
+        st.warning("No client transactions match the selected filters.")
+        st.stop()
+
 # ------------------------------------------------------------
 # 📊 PERFORMANCE DASHBOARD
 # ------------------------------------------------------------
@@ -476,10 +518,9 @@ if page == "Performance Dashboard":
 
     # Top Product Analysis
     if os.path.exists("data/OnlineRetail.csv"):
-        raw = pd.read_csv("data/OnlineRetail.csv", encoding='latin1')
-        raw["Total"] = raw["Quantity"] * raw["UnitPrice"]
-        top_product = raw.groupby("Description")["Total"].sum().sort_values(ascending=False).head(1).index[0]
-        top_product_revenue = raw.groupby("Description")["Total"].sum().sort_values(ascending=False).head(1).values[0]
+        product_revenue = load_products().set_index("Description")["Revenue"]
+        top_product = product_revenue.idxmax()
+        top_product_revenue = product_revenue.max()
         
         st.markdown("<div class='section-container'>", unsafe_allow_html=True)
         st.subheader("KEY REVENUE DRIVER")
@@ -537,12 +578,11 @@ elif page == "Product Intelligence":
     st.markdown("### REVENUE ANALYSIS AND RISK ASSESSMENT")
 
     if os.path.exists("data/OnlineRetail.csv"):
-        raw = pd.read_csv("data/OnlineRetail.csv", encoding='latin1')
-        raw["Total"] = raw["Quantity"] * raw["UnitPrice"]
+        products = load_products()
 
         # Top Products
         st.subheader("TOP REVENUE GENERATING PRODUCTS")
-        top_products = raw.groupby("Description")["Total"].sum().nlargest(10).reset_index()
+        top_products = products.nlargest(10, "Revenue").rename(columns={"Revenue": "Total"})
         
         fig1 = go.Figure(go.Bar(
             x=top_products["Total"],
@@ -582,10 +622,13 @@ elif page == "Product Intelligence":
 
         # Return Risk Analysis
         st.subheader("PRODUCT RETURN ANALYSIS")
-        returns = raw[raw["InvoiceNo"].astype(str).str.startswith("C")]
+        returns = products[products["ReturnLines"] > 0]
         
         if not returns.empty:
-            returned = returns.groupby("Description")["Quantity"].sum().abs().nlargest(10).reset_index()
+            returned = (
+                returns.assign(Quantity=returns["ReturnQuantity"].abs())
+                .nlargest(10, "Quantity")[["Description", "Quantity"]]
+            )
             
             fig2 = go.Figure(go.Bar(
                 x=returned["Quantity"],
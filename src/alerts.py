@@ -0,0 +1,212 @@
+# src/alerts.py
+import os
+import argparse
+
+import numpy as np
+import pandas as pd
+
+from src.artifacts import ensure_artifact, is_fresh
+from src.rollups import ensure_rollups
+from src.store import CACHE_DIR, default_raw_path
+
+ALERTS_VERSION = 'alerts-v2'
+ALERTS_DIR = os.path.join(CACHE_DIR, 'alerts')
+
+# EWMA smoothing of each series' mean / variance
+ALPHA = 0.1
+# |z| above this on a single day -> Spike / Drop
+SPIKE_Z = 4.0
+# CUSUM slack and decision interval, in standard deviations -> Upward / Downward shift
+CUSUM_K = 0.5
+CUSUM_H = 5.0
+# active days a series is observed before it may alert
+WARMUP_DAYS = 14
+# products monitored besides the total and every country (largest revenue first)
+TOP_PRODUCTS = 50
+# floor for a series' standard deviation, relative to its mean and absolute
+MIN_SCALE_FRACTION = 0.05
+MIN_SCALE = 1.0
+
+PARAMS = {'alpha': ALPHA, 'spike_z': SPIKE_Z, 'cusum_k': CUSUM_K, 'cusum_h': CUSUM_H,
+          'warmup_days': WARMUP_DAYS, 'top_products': TOP_PRODUCTS}
+
+STATE_COLUMNS = ['Series', 'Kind', 'Name', 'Days', 'Mean', 'Var', 'CusumUp', 'CusumDown', 'LastValue', 'LastZ', 'Through']
+ALERT_COLUMNS = ['Date', 'Series', 'Kind', 'Name', 'Type', 'Revenue', 'Expected', 'Z']
+# one alert per day, series and alert type
+ALERT_KEY = ['Date', 'Series', 'Type']
+
+
+def alert_paths(raw_path=None):
+    raw_path = raw_path or default_raw_path()
+    base = os.path.join(ALERTS_DIR, os.path.basename(raw_path))
+    return {
+        'state': os.path.join(base, 'state.parquet'),
+        'alerts': os.path.join(base, 'alerts.parquet'),
+    }
+
+
+def series_id(kind, name):
+    return 'total' if kind == 'Total' else f'{kind.lower()}:{name}'
+
+
+def daily_revenue(cube_path, after=None, products=None):
+    """
+    Daily revenue of the monitored series from the rollup cube, for trading
+    days after `after` only: one row per date, one column per series id
+    (total, country:<name>, product:<description>), NaN on days a series
+    had no lines. Returns (revenue, {series id: (kind, name)}).
+    """
+    filters = [('Date', '>', pd.Timestamp(after))] if after is not None else None
+    cube = pd.read_parquet(cube_path, columns=['Date', 'Country', 'Description', 'Revenue'], filters=filters)
+    total = cube.groupby('Date')['Revenue'].sum().rename('total').to_frame()
+    countries = cube.pivot_table(index='Date', columns='Country', values='Revenue', aggfunc='sum', observed=True)
+    if products is None:
+        # largest products over the history seen so far
+        products = cube.groupby('Description', observed=True)['Revenue'].sum().nlargest(TOP_PRODUCTS).index
+    cube = cube[cube['Description'].isin(products)]
+    items = cube.pivot_table(index='Date', columns='Description', values='Revenue', aggfunc='sum', observed=True)
+
+    meta = {'total': ('Total', 'All')}
+    meta.update({series_id('Country', name): ('Country', str(name)) for name in countries.columns})
+    meta.update({series_id('Product', name): ('Product', str(name)) for name in items.columns})
+    countries.columns = [series_id('Country', name) for name in countries.columns]
+    items.columns = [series_id('Product', name) for name in items.columns]
+    revenue = pd.concat([total, countries, items], axis=1)
+    return revenue, meta
+
+
+def step(state, values):
+    """
+    Advances every series by one day. `state` holds numpy arrays (Days, Mean,
+    Var, CusumUp, CusumDown) updated in place; `values` is the day's revenue
+    per series, NaN for series without lines that day. Those are left as
+    they are: an intermittent product is compared with the days it sells,
+    not with a baseline dragged to zero by the days it does not. Returns
+    (z, alert type per series or ''), z NaN for inactive series.
+    """
+    days, mean, var = state['Days'], state['Mean'], state['Var']
+    active = ~np.isnan(values)
+    first = active & (days == 0)
+    mean[first] = values[first]
+    var[first] = 0.0
+
+    scale = np.maximum.reduce([np.sqrt(var), MIN_SCALE_FRACTION * np.abs(mean), np.full_like(mean, MIN_SCALE)])
+    z = (values - mean) / scale
+    armed = active & (days >= WARMUP_DAYS)
+
+    up = np.maximum(0.0, state['CusumUp'] + z - CUSUM_K)
+    down = np.maximum(0.0, state['CusumDown'] - z - CUSUM_K)
+    kind = np.full(len(values), '', dtype=object)
+    kind[armed & (up > CUSUM_H)] = 'Upward shift'
+    kind[armed & (down > CUSUM_H)] = 'Downward shift'
+    kind[armed & (z > SPIKE_Z)] = 'Spike'
+    kind[armed & (z < -SPIKE_Z)] = 'Drop'
+    # a signalled shift restarts its CUSUM; nothing accumulates during warm-up
+    up[(up > CUSUM_H) | ~armed] = 0.0
+    down[(down > CUSUM_H) | ~armed] = 0.0
+    state['CusumUp'][:] = np.where(active, up, state['CusumUp'])
+    state['CusumDown'][:] = np.where(active, down, state['CusumDown'])
+
+    # outliers are clipped before they enter the EWMA, so one spike does not
+    # inflate the baseline for weeks
+    clipped = np.clip(values, mean - SPIKE_Z * scale, mean + SPIKE_Z * scale)
+    delta = np.where(first | ~active, 0.0, clipped - mean)
+    mean += ALPHA * delta
+    var[:] = np.where(active, (1 - ALPHA) * (var + ALPHA * delta ** 2), var)
+    days += active
+    return z, kind
+
+
+def update_alerts(raw_path=None, rebuild=False):
+    """
+    Brings the alert state up to date with the transaction store and returns
+    (state, new alerts).
+
+    Only trading days after the state's last processed day are read and
+    stepped through, so an update costs O(new days x series); the running
+    EWMA mean/variance and CUSUM sums of every series are persisted between
+    runs. The latest day in the data may still be receiving invoices, so it
+    is left open until a later day appears. The monitored products are
+    picked when the state is first built; countries that appear later are
+    added as new series. Changing ALERTS_VERSION or PARAMS (or `rebuild`)
+    starts over from the first day.
+    """
+    raw_path = raw_path or default_raw_path()
+    paths = alert_paths(raw_path)
+    rollups = ensure_rollups(raw_path)
+
+    if not rebuild and is_fresh(paths['state'], [], ALERTS_VERSION, PARAMS) and os.path.exists(paths['alerts']):
+        state = pd.read_parquet(paths['state'])
+        alerts = pd.read_parquet(paths['alerts'])
+    else:
+        state, alerts = pd.DataFrame(columns=STATE_COLUMNS), pd.DataFrame(columns=ALERT_COLUMNS)
+    through = state['Through'].max() if len(state) else None
+
+    last_day = pd.read_parquet(rollups['day_country'], columns=['Date'])['Date'].max()
+    if through is not None and last_day <= through + pd.Timedelta(days=1):
+        return state, alerts.iloc[:0]
+
+    products = state.loc[state['Kind'] == 'Product', 'Name'].tolist() if len(state) else None
+    revenue, meta = daily_revenue(rollups['cube'], through, products)
+    revenue = revenue[revenue.index < last_day]
+    if revenue.empty:
+        return state, alerts.iloc[:0]
+
+    # new series (first run, or a country seen for the first time)
+    new = [sid for sid in revenue.columns if sid not in set(state['Series'])]
+    if new:
+        added = pd.DataFrame({'Series': new, 'Kind': [meta[sid][0] for sid in new],
+                              'Name': [meta[sid][1] for sid in new]})
+        state = pd.concat([state, added], ignore_index=True) if len(state) else added.reindex(columns=STATE_COLUMNS)
+        state = state.fillna({'Days': 0, 'Mean': 0.0, 'Var': 0.0, 'CusumUp': 0.0, 'CusumDown': 0.0})
+    values = revenue.reindex(columns=state['Series']).to_numpy(dtype='float64')
+
+    arrays = {column: state[column].to_numpy(dtype='int64' if column == 'Days' else 'float64', copy=True)
+              for column in ['Days', 'Mean', 'Var', 'CusumUp', 'CusumDown']}
+    found = []
+    for date, row in zip(revenue.index, values):
+        expected = arrays['Mean'].copy()
+        z, kind = step(arrays, row)
+        for i in np.flatnonzero(kind != ''):
+            found.append((date, state['Series'].iat[i], state['Kind'].iat[i], state['Name'].iat[i],
+                          kind[i], row[i], expected[i], z[i]))
+
+    for column, array in arrays.items():
+        state[column] = array
+    state['LastValue'] = np.nan_to_num(values[-1])
+    state['LastZ'] = z
+    state['Through'] = revenue.index[-1]
+    new_alerts = pd.DataFrame(found, columns=ALERT_COLUMNS)
+    if len(alerts):
+        # a replay after a crash between the two writes below finds its alerts already saved
+        saved = pd.MultiIndex.from_frame(alerts[ALERT_KEY])
+        new_alerts = new_alerts[~pd.MultiIndex.from_frame(new_alerts[ALERT_KEY]).isin(saved)].reset_index(drop=True)
+        alerts = pd.concat([alerts, new_alerts], ignore_index=True)
+    else:
+        alerts = new_alerts
+
+    # alerts first: a crash in between leaves the old state, which is then
+    # replayed without duplicating the alerts it already wrote
+    ensure_artifact(paths['alerts'], [], ALERTS_VERSION,
+                    lambda tmp_path: alerts.to_parquet(tmp_path, index=False), PARAMS, force=True)
+    ensure_artifact(paths['state'], [], ALERTS_VERSION,
+                    lambda tmp_path: state.to_parquet(tmp_path, index=False), PARAMS, force=True)
+    return state, new_alerts
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Update the EWMA/CUSUM revenue alerts with the days added since the last run")
+    parser.add_argument('--raw', default=None, help="raw transactions file (default: data/OnlineRetail.*)")
+    parser.add_argument('--rebuild', action='store_true', help="discard the saved state and replay every day")
+    args = parser.parse_args()
+
+    import time
+    start = time.perf_counter()
+    state, new_alerts = update_alerts(args.raw, args.rebuild)
+    if not len(state):
+        print("⏭️ Not enough closed days to monitor yet.")
+    else:
+        print(f"✅ {len(state)} series monitored through {state['Through'].max():%Y-%m-%d} "
+              f"({time.perf_counter() - start:.2f}s), {len(new_alerts)} new alert(s)")
+        if len(new_alerts):
+            print(new_alerts.tail(20).to_string(index=False))
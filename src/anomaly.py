@@ -0,0 +1,189 @@
+# src/anomaly.py
+import os
+
+import numpy as np
+import pandas as pd
+
+from src.artifacts import ensure_artifact, is_fresh
+from src.schema import is_cancelled
+from src.store import CACHE_DIR, build_store, default_raw_path, load_transactions
+
+ANOMALY_VERSION = 'anomaly-v2'
+ANOMALY_DIR = os.path.join(CACHE_DIR, 'anomaly')
+
+COLUMNS = ['InvoiceNo', 'StockCode', 'Description', 'Quantity', 'InvoiceDate', 'UnitPrice', 'CustomerID', 'Country']
+
+# robust z-score above which a line is flagged (Iglewicz & Hoaglin's 3.5)
+THRESHOLD = 3.5
+# groups with fewer baseline observations are scored against the global baseline
+MIN_GROUP_SIZE = 5
+# MAD and mean absolute deviation -> standard deviation, for normal data
+MAD_SCALE = 1.4826
+MEAN_AD_SCALE = 1.2533
+
+# reason -> (value, baseline group). Quantities and invoice totals are compared
+# in absolute terms, so a huge return is as suspicious as a huge order.
+CHECKS = {
+    'Unit price vs product': ('UnitPrice', 'StockCode'),
+    'Quantity vs product': ('AbsQuantity', 'StockCode'),
+    'Quantity vs customer': ('AbsQuantity', 'CustomerID'),
+    'Invoice total vs customer': ('AbsInvoiceTotal', 'CustomerID'),
+}
+
+
+def anomaly_paths(raw_path=None):
+    raw_path = raw_path or default_raw_path()
+    base = os.path.join(ANOMALY_DIR, os.path.basename(raw_path))
+    return {
+        'flagged': os.path.join(base, 'flagged.parquet'),
+        'by_reason': os.path.join(base, 'by_reason.parquet'),
+        'by_country': os.path.join(base, 'by_country.parquet'),
+    }
+
+
+def _codes(keys):
+    # int group keys, -1 for missing (categorical codes / nullable ids)
+    if isinstance(keys.dtype, pd.CategoricalDtype):
+        return keys.cat.codes.to_numpy(dtype='int64')
+    return keys.fillna(-1).to_numpy(dtype='int64')
+
+
+def robust_z(values, keys, baseline, min_group_size=MIN_GROUP_SIZE):
+    """
+    |value - median| / scale of every value against the median and MAD of its
+    group, computed from the `baseline` rows only. Groups with a zero MAD fall
+    back to the mean absolute deviation; groups smaller than `min_group_size`
+    (and missing keys) use the global baseline. Returns (z, median) arrays.
+    """
+    values = np.asarray(values, dtype='float64')
+    keys = np.asarray(keys, dtype='int64')
+    ref = pd.DataFrame({'key': keys[baseline], 'x': values[baseline]})
+    ref = ref[ref['key'] >= 0]
+
+    grouped = ref.groupby('key')['x']
+    median = grouped.transform('median')
+    deviation = (ref['x'] - median).abs().groupby(ref['key'])
+    stats = pd.DataFrame({'Median': grouped.median(), 'Count': grouped.size(),
+                          'MAD': deviation.median(), 'MeanAD': deviation.mean()})
+    stats['Scale'] = np.where(stats['MAD'] > 0, MAD_SCALE * stats['MAD'], MEAN_AD_SCALE * stats['MeanAD'])
+    stats = stats[(stats['Count'] >= min_group_size) & (stats['Scale'] > 0)]
+
+    all_ref = values[baseline]
+    global_median = np.median(all_ref)
+    global_deviation = np.abs(all_ref - global_median)
+    global_scale = MAD_SCALE * np.median(global_deviation) or MEAN_AD_SCALE * global_deviation.mean() or 1.0
+
+    per_row = stats.reindex(keys)
+    row_median = per_row['Median'].fillna(global_median).to_numpy()
+    row_scale = per_row['Scale'].fillna(global_scale).to_numpy()
+    return np.abs(values - row_median) / row_scale, row_median
+
+
+def score_transactions(df, threshold=THRESHOLD, min_group_size=MIN_GROUP_SIZE):
+    """
+    Scores every line against the CHECKS baselines in one pass. Baselines
+    are built from sales lines (not cancelled, Quantity and UnitPrice > 0);
+    invoice totals are baselined per customer over their invoices. An
+    invoice total is one observation, so its score goes to a single line of
+    the invoice (the one with the largest absolute total), not to all of
+    them. Returns the lines with Score (the largest robust z), Reason (the
+    check that produced it), Baseline (that check's expected value) and
+    Flagged.
+    """
+    inv_codes = _codes(df['InvoiceNo'])
+    total = df['Quantity'].to_numpy(dtype='float64') * df['UnitPrice'].to_numpy()
+    sales = (~is_cancelled(df['InvoiceNo']) & (df['Quantity'] > 0) & (df['UnitPrice'] > 0)).to_numpy()
+    lines = pd.DataFrame({
+        'UnitPrice': df['UnitPrice'].to_numpy(dtype='float64'),
+        'AbsQuantity': np.abs(df['Quantity'].to_numpy(dtype='float64')),
+        'StockCode': _codes(df['StockCode']),
+        'CustomerID': _codes(df['CustomerID']),
+    })
+
+    # one row per invoice: its customer, total and whether it is a sale
+    invoices = pd.DataFrame({'Invoice': inv_codes, 'Total': total, 'CustomerID': lines['CustomerID'],
+                             'Sale': sales}).groupby('Invoice').agg(
+        Total=('Total', 'sum'), CustomerID=('CustomerID', 'first'), Sale=('Sale', 'all'))
+    invoice_z, invoice_median = robust_z(invoices['Total'].abs(), invoices['CustomerID'],
+                                         invoices['Sale'].to_numpy(), min_group_size)
+    position = invoices.index.get_indexer(inv_codes)
+    # the line that carries its invoice's total score
+    carrier = np.zeros(len(df), dtype=bool)
+    carrier[pd.Series(np.nan_to_num(np.abs(total), nan=-1.0)).groupby(inv_codes).idxmax().to_numpy()] = True
+
+    z_columns, medians = [], []
+    for value, key in CHECKS.values():
+        if value == 'AbsInvoiceTotal':
+            z, median = np.where(carrier, invoice_z[position], 0.0), invoice_median[position]
+        else:
+            z, median = robust_z(lines[value], lines[key], sales, min_group_size)
+        z_columns.append(z)
+        medians.append(median)
+    z = np.nan_to_num(np.column_stack(z_columns), nan=0.0, posinf=0.0)
+    winner = z.argmax(axis=1)
+    rows = np.arange(len(df))
+
+    scored = df.copy()
+    scored['Total'] = total
+    scored['InvoiceTotal'] = invoices['Total'].to_numpy()[position]
+    scored['Score'] = z[rows, winner]
+    scored['Reason'] = pd.Categorical.from_codes(winner, categories=list(CHECKS))
+    scored['Baseline'] = np.column_stack(medians)[rows, winner]
+    scored['Flagged'] = scored['Score'] >= threshold
+    return scored
+
+
+def summarize(flagged, lines):
+    """
+    (by_reason, by_country) tables of the `flagged` lines: flagged lines and
+    value per reason, and per country next to `lines` (all lines per country,
+    the flag rate's denominator). A line flagged for its invoice total stands
+    for the whole invoice, so its value is the invoice total.
+    """
+    by_invoice = (flagged['Reason'] == 'Invoice total vs customer').to_numpy()
+    flagged = flagged.assign(Value=np.where(by_invoice, flagged['InvoiceTotal'], flagged['Total']))
+    flagged['Value'] = flagged['Value'].abs()
+    by_reason = flagged.groupby('Reason', observed=False).agg(
+        Lines=('Score', 'size'),
+        Invoices=('InvoiceNo', 'nunique'),
+        Value=('Value', 'sum'),
+        MaxScore=('Score', 'max'),
+    ).reset_index()
+    by_country = lines.rename('Lines').to_frame()
+    by_country['Flagged'] = flagged.groupby('Country', observed=True).size()
+    by_country['FlaggedValue'] = flagged.groupby('Country', observed=True)['Value'].sum()
+    by_country = by_country.fillna({'Flagged': 0, 'FlaggedValue': 0.0}).astype({'Flagged': 'int64'})
+    by_country['FlagRate'] = by_country['Flagged'] / by_country['Lines']
+    by_country = by_country.sort_values('Flagged', ascending=False)
+    return by_reason, by_country.rename_axis('Country').reset_index()
+
+
+def ensure_anomalies(raw_path=None, force=False):
+    """
+    Scores the transaction store and persists the flagged lines (ranked by
+    score) and the two summaries; returns their paths. Rebuilt only when the
+    raw data or ANOMALY_VERSION changes.
+    """
+    raw_path = raw_path or default_raw_path()
+    store_path = build_store(raw_path)
+    paths = anomaly_paths(raw_path)
+    if force or not all(is_fresh(path, [store_path], ANOMALY_VERSION) for path in paths.values()):
+        scored = score_transactions(load_transactions(COLUMNS, raw_path=raw_path))
+        flagged = scored[scored['Flagged']].drop(columns='Flagged').sort_values('Score', ascending=False)
+        by_reason, by_country = summarize(flagged, scored.groupby('Country', observed=True).size())
+        del scored
+        for name, table in (('flagged', flagged), ('by_reason', by_reason), ('by_country', by_country)):
+            ensure_artifact(paths[name], [store_path], ANOMALY_VERSION,
+                            lambda tmp_path: table.to_parquet(tmp_path, index=False), force=True)
+    return paths
+
+
+if __name__ == "__main__":
+    import time
+    start = time.perf_counter()
+    paths = ensure_anomalies(force=True)
+    print(f"✅ Transactions scored in {time.perf_counter() - start:.2f}s")
+    print(pd.read_parquet(paths['by_reason']).to_string(index=False))
+    top = pd.read_parquet(paths['flagged']).head(10)
+    print(top[['InvoiceNo', 'StockCode', 'Quantity', 'UnitPrice', 'Score', 'Reason', 'Baseline']].to_string(index=False))
+    print(f"✅ Flagged lines saved at: {paths['flagged']}")
@@ -0,0 +1,163 @@
+# src/artifacts.py
+import os
+import json
+import hashlib
+import tempfile
+from datetime import datetime
+
+# Every derived file gets a sidecar manifest next to it:
+#   <artifact>.meta.json = {version, params, sources: {path: {sha256, size, mtime_ns}}}
+# An artifact is fresh when its version and params match and every source
+# still has the recorded content hash.
+MANIFEST_SUFFIX = '.meta.json'
+
+# (size, mtime_ns) -> sha256 per path, so a running process hashes a file once
+_hash_cache = {}
+
+
+def file_sha256(path):
+    """
+    SHA-256 of a file's content, read in 1 MB blocks.
+    """
+    stat = os.stat(path)
+    key = (os.path.abspath(path), stat.st_size, stat.st_mtime_ns)
+    if key in _hash_cache:
+        return _hash_cache[key]
+
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    _hash_cache[key] = digest.hexdigest()
+    return _hash_cache[key]
+
+
+def _fingerprint(path):
+    stat = os.stat(path)
+    return {'sha256': file_sha256(path), 'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns}
+
+
+def manifest_path(artifact_path):
+    return artifact_path + MANIFEST_SUFFIX
+
+
+def read_manifest(artifact_path):
+    """
+    Returns the manifest of an artifact, or None if it was never recorded.
+    """
+    path = manifest_path(artifact_path)
+    if not os.path.exists(path):
+        return None
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _temp_path(path):
+    # a unique sibling of `path` (same directory, so os.replace stays atomic);
+    # concurrent builders of the same artifact never share a temp file
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(path)),
+                                    prefix=os.path.basename(path) + '.', suffix='.tmp')
+    os.close(fd)
+    return tmp_path
+
+
+def _remove(path):
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+
+
+def atomic_write(path, write):
+    """
+    Calls `write(tmp_path)` on a unique temp file next to `path`, then moves
+    it into place: readers see the old file or the complete new one, and
+    concurrent writers never share a temp file.
+    """
+    tmp_path = _temp_path(path)
+    try:
+        write(tmp_path)
+        os.replace(tmp_path, path)
+    except BaseException:
+        _remove(tmp_path)
+        raise
+    return path
+
+
+def write_manifest(artifact_path, sources, version, params=None):
+    """
+    Records what an artifact was built from. Call after the artifact is written.
+    """
+    manifest = {
+        'version': version,
+        'params': params or {},
+        'sources': {os.path.abspath(src): _fingerprint(src) for src in sources},
+        'built_at': datetime.now().isoformat(timespec='seconds'),
+    }
+    def write(tmp_path):
+        with open(tmp_path, 'w') as f:
+            json.dump(manifest, f, indent=2)
+
+    atomic_write(manifest_path(artifact_path), write)
+    return manifest
+
+
+def _source_unchanged(path, recorded):
+    if not os.path.exists(path):
+        return False
+    stat = os.stat(path)
+    # same size and mtime -> trust the recorded hash, otherwise re-hash the content
+    if stat.st_size == recorded.get('size') and stat.st_mtime_ns == recorded.get('mtime_ns'):
+        return True
+    return file_sha256(path) == recorded.get('sha256')
+
+
+def is_fresh(artifact_path, sources, version, params=None):
+    """
+    True if the artifact exists and was built from the current content of
+    `sources` with the same code/schema version and parameters.
+    """
+    if not os.path.exists(artifact_path):
+        return False
+    manifest = read_manifest(artifact_path)
+    if manifest is None:
+        return False
+    if manifest['version'] != version or manifest['params'] != (params or {}):
+        return False
+
+    recorded = manifest['sources']
+    wanted = [os.path.abspath(src) for src in sources]
+    if sorted(recorded) != sorted(wanted):
+        return False
+    return all(_source_unchanged(src, recorded[src]) for src in wanted)
+
+
+def ensure_artifact(artifact_path, sources, version, build, params=None, force=False):
+    """
+    Rebuilds an artifact only if it is stale and returns its path.
+
+    `build(tmp_path)` must write the artifact to `tmp_path` (a unique, empty
+    file next to the artifact); it is moved into place and the manifest is
+    written only once the build succeeded, so a crashed build never leaves a
+    "fresh" half-written file behind.
+    """
+    if not force and is_fresh(artifact_path, sources, version, params):
+        return artifact_path
+
+    os.makedirs(os.path.dirname(os.path.abspath(artifact_path)), exist_ok=True)
+    atomic_write(artifact_path, build)
+    write_manifest(artifact_path, sources, version, params)
+    return artifact_path
+
+
+def artifact_key(artifact_path):
+    """
+    Short id of the artifact's current build (changes on every rebuild),
+    handy as a cache key for readers.
+    """
+    manifest = read_manifest(artifact_path) or {}
+    payload = json.dumps(manifest, sort_keys=True).encode()
+    return hashlib.sha256(payload).hexdigest()[:16]
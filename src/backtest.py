@@ -0,0 +1,217 @@
+# src/backtest.py
+import os
+import time
+import resource
+import argparse
+from contextlib import contextmanager
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+from sklearn.linear_model import LogisticRegression
+from sklearn.metrics import roc_auc_score
+from sklearn.preprocessing import StandardScaler
+from threadpoolctl import threadpool_limits
+
+from src.data_preprocess import clean_data, load_data
+from src.features import create_rfm_panel
+from src.model_bundle import MODEL_DIR
+
+FEATURES = ['Recency', 'Frequency', 'Monetary']
+LABEL = 'NextMonthPurchase'
+FOLDS_PATH = os.path.join(MODEL_DIR, 'backtest_folds.csv')
+STAGES_PATH = os.path.join(MODEL_DIR, 'backtest_stages.csv')
+
+# set per worker process by _init_worker: (X, y) of the whole panel
+_PANEL = None
+
+
+def _proc_status_mb(field):
+    # VmRSS / VmHWM of this process (Linux only, kilobytes), None elsewhere
+    try:
+        with open('/proc/self/status') as f:
+            for line in f:
+                if line.startswith(field + ':'):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return None
+
+
+def _reset_peak_rss():
+    """
+    Resets the process high-water mark (VmHWM) to the current RSS, so the next
+    peak reading covers only what runs after this call. Returns the RSS in MB.
+    """
+    try:
+        with open('/proc/self/clear_refs', 'w') as f:
+            f.write('5')
+    except OSError:
+        pass
+    rss = _proc_status_mb('VmRSS')
+    return rss if rss is not None else _max_rss_mb()
+
+
+def _max_rss_mb():
+    # high-water mark since the last _reset_peak_rss(); ru_maxrss (the all-time
+    # peak, kilobytes on Linux) where /proc is not available
+    peak = _proc_status_mb('VmHWM')
+    return peak if peak is not None else resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+@contextmanager
+def measure(stages, name):
+    """
+    Records wall-clock seconds and peak memory of the block into `stages`:
+    max_rss_mb is the high-water mark reached inside the block (reset before
+    it) and rss_growth_mb that peak minus the RSS when the block started. No
+    allocation tracing runs while the block is timed (tracemalloc would slow
+    it down).
+    """
+    rss_before = _reset_peak_rss()
+    start = time.perf_counter()
+    yield
+    seconds = time.perf_counter() - start
+    peak = _max_rss_mb()
+    stages.append({
+        'stage': name,
+        'seconds': round(seconds, 4),
+        'max_rss_mb': round(peak, 1),
+        'rss_growth_mb': round(max(peak - rss_before, 0.0), 1),
+    })
+
+
+def walk_forward_cutoffs(df, step_days=7, min_history_days=90, label_window_days=30):
+    """
+    Cutoffs every `step_days` from `min_history_days` after the first invoice
+    up to the last date whose label window is still fully inside the data.
+    """
+    first, last = df['InvoiceDate'].min().normalize(), df['InvoiceDate'].max().normalize()
+    start = first + pd.Timedelta(days=min_history_days)
+    end = last - pd.Timedelta(days=label_window_days)
+    return pd.date_range(start, end, freq=f'{step_days}D')
+
+
+def fold_slices(panel, label_window_days=30, train_cutoffs=None):
+    """
+    (cutoff, train rows, test rows) per cutoff of a panel sorted by CutoffDate.
+
+    A fold at cutoff c trains on the snapshots whose label window had closed
+    by c (CutoffDate + window <= c), so no future purchases leak into
+    training, and tests on the snapshot at c. `train_cutoffs` limits training
+    to that many most recent usable cutoffs (default: expanding window).
+    """
+    cutoffs, offsets = np.unique(panel['CutoffDate'].to_numpy(), return_index=True)
+    offsets = np.append(offsets, len(panel))
+    window = np.timedelta64(label_window_days, 'D')
+    for k, cutoff in enumerate(cutoffs):
+        train_end = np.searchsorted(cutoffs, cutoff - window, side='right')
+        train_start = 0 if train_cutoffs is None else max(0, train_end - train_cutoffs)
+        if train_end == 0:
+            continue
+        yield (pd.Timestamp(cutoff),
+               slice(offsets[train_start], offsets[train_end]),
+               slice(offsets[k], offsets[k + 1]))
+
+
+def _init_worker(X, y):
+    global _PANEL
+    _PANEL = (X, y)
+    # one BLAS thread per process; the pool already uses every core
+    threadpool_limits(1)
+
+
+def run_fold(cutoff, train, test):
+    """Trains on `train` rows and scores `test` rows of the panel. Runs in a worker."""
+    X, y = _PANEL
+    # peak of this fold only, not of earlier folds run by the same worker
+    rss_before = _reset_peak_rss()
+    result = {'cutoff': cutoff.date(), 'train_rows': train.stop - train.start,
+              'test_rows': test.stop - test.start, 'positive_rate': float(y[test].mean())}
+
+    start = time.perf_counter()
+    if len(np.unique(y[train])) < 2:
+        peak = _max_rss_mb()
+        result.update(roc_auc=np.nan, train_seconds=0.0, score_seconds=0.0,
+                      max_rss_mb=peak, rss_growth_mb=max(peak - rss_before, 0.0))
+        return result
+    scaler = StandardScaler().fit(X[train])
+    model = LogisticRegression(max_iter=1000).fit(scaler.transform(X[train]), y[train])
+    result['train_seconds'] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    proba = model.predict_proba(scaler.transform(X[test]))[:, 1]
+    result['score_seconds'] = time.perf_counter() - start
+    result['roc_auc'] = roc_auc_score(y[test], proba) if len(np.unique(y[test])) == 2 else np.nan
+    # the worker's high-water mark during this fold, read after the timed sections
+    result['max_rss_mb'] = _max_rss_mb()
+    result['rss_growth_mb'] = max(result['max_rss_mb'] - rss_before, 0.0)
+    return result
+
+
+def run_backtest(raw_path='data/OnlineRetail.xlsx', step_days=7, min_history_days=90,
+                 label_window_days=30, train_cutoffs=None, max_workers=None):
+    """
+    Walk-forward backtest of the RFM next-month purchase model (src/model.py).
+
+    The RFM + label snapshots for all cutoffs come from one create_rfm_panel
+    sweep (same values as create_rfm / create_label per cutoff); the folds
+    are trained and scored in a process pool. Returns (folds, stages)
+    DataFrames: ROC-AUC and timings per cutoff, and wall-clock / peak memory
+    per stage.
+    """
+    stages = []
+    with measure(stages, 'load'):
+        df = load_data(raw_path)
+    with measure(stages, 'clean'):
+        df = clean_data(df)
+    with measure(stages, 'panel'):
+        cutoffs = walk_forward_cutoffs(df, step_days, min_history_days, label_window_days)
+        panel = create_rfm_panel(df, cutoffs, label_window_days)
+        X = panel[FEATURES].to_numpy(dtype='float64')
+        y = panel[LABEL].to_numpy()
+        folds = list(fold_slices(panel, label_window_days, train_cutoffs))
+    del df
+
+    with measure(stages, 'train+score'):
+        with ProcessPoolExecutor(max_workers=max_workers, initializer=_init_worker, initargs=(X, y)) as pool:
+            results = list(pool.map(run_fold, *zip(*folds))) if folds else []
+
+    results = pd.DataFrame(results)
+    stages = pd.DataFrame(stages)
+    if len(results):
+        # worker-side totals, next to the wall clock of the parallel stage
+        for name, column in (('fold train (sum)', 'train_seconds'), ('fold score (sum)', 'score_seconds')):
+            stages.loc[len(stages)] = {'stage': name, 'seconds': round(results[column].sum(), 4),
+                                       'max_rss_mb': round(results['max_rss_mb'].max(), 1),
+                                       'rss_growth_mb': round(results['rss_growth_mb'].max(), 1)}
+    return results, stages
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Walk-forward backtest of the next-month purchase model")
+    parser.add_argument('--raw', default='data/OnlineRetail.xlsx')
+    parser.add_argument('--step-days', type=int, default=7, help="days between cutoffs")
+    parser.add_argument('--min-history-days', type=int, default=90, help="history before the first cutoff")
+    parser.add_argument('--label-window-days', type=int, default=30)
+    parser.add_argument('--train-cutoffs', type=int, default=None,
+                        help="train on only this many most recent cutoffs (default: all, expanding window)")
+    parser.add_argument('--workers', type=int, default=None, help="worker processes (default: all cores)")
+    args = parser.parse_args()
+
+    total_start = time.perf_counter()
+    folds, stages = run_backtest(args.raw, args.step_days, args.min_history_days,
+                                 args.label_window_days, args.train_cutoffs, args.workers)
+
+    os.makedirs(MODEL_DIR, exist_ok=True)
+    folds.to_csv(FOLDS_PATH, index=False)
+    stages.to_csv(STAGES_PATH, index=False)
+
+    print("\n📈 ROC-AUC per cutoff:")
+    print(folds[['cutoff', 'train_rows', 'test_rows', 'positive_rate', 'roc_auc',
+                 'train_seconds', 'score_seconds']].to_string(index=False))
+    print(f"\n✅ Mean ROC-AUC over {folds['roc_auc'].notna().sum()} cutoffs: {folds['roc_auc'].mean():.4f}")
+    print("\n⏱️ Stages:")
+    print(stages.to_string(index=False))
+    print(f"\n🎉 Backtest finished in {time.perf_counter() - total_start:.2f}s "
+          f"(results: {FOLDS_PATH}, {STAGES_PATH})")
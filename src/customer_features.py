@@ -0,0 +1,106 @@
+# src/customer_features.py
+import numpy as np
+import pandas as pd
+
+from src.schema import is_cancelled
+
+# the eleven model inputs, in the order the propensity model was trained on
+FEATURE_COLUMNS = [
+    'Recency', 'CustomerTenure', 'Frequency', 'Monetary', 'UniqueProducts',
+    'NumOrders', 'AOV', 'AvgBasketSize', 'AvgPurchaseInterval',
+    'LastMonthSpend', 'ReturnRate'
+]
+
+DAY_MS = 86_400_000
+
+
+def _codes(series):
+    # integer codes per distinct value, -1 for missing
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        return series.cat.codes.to_numpy().astype('int64')
+    return pd.factorize(series)[0].astype('int64')
+
+
+def _count_distinct(group, values, n_groups):
+    # number of distinct (group, value) pairs per group, missing values ignored
+    valid = values >= 0
+    base = max(values.max(initial=0), 0) + 1
+    pairs = np.unique(group[valid] * base + values[valid])
+    return np.bincount(pairs // base, minlength=n_groups)
+
+
+def _sum(group, values, n_groups):
+    values = np.nan_to_num(values.astype('float64'))
+    return np.bincount(group, weights=values, minlength=n_groups)
+
+
+def build_customer_features(df, snapshot_date=None, last_month_days=30):
+    """
+    Computes the customer-level model features from cleaned transactions
+    (CustomerID, InvoiceNo, StockCode, Quantity, InvoiceDate, TotalPrice, Country).
+
+    Everything is done with one sort by (customer, date) and array reductions
+    over the customer segments - no Python code runs per customer.
+    `snapshot_date` defaults to the day after the last invoice.
+    Returns one row per CustomerID with FEATURE_COLUMNS plus TotalQuantity and Country.
+    """
+    df = df.dropna(subset=['CustomerID', 'InvoiceDate'])
+
+    group, customers = pd.factorize(df['CustomerID'], sort=True)
+    n = len(customers)
+    ts = df['InvoiceDate'].to_numpy(dtype='datetime64[ms]').view('int64')
+
+    if snapshot_date is None:
+        snapshot = ts.max() + DAY_MS
+    else:
+        snapshot = np.datetime64(pd.Timestamp(snapshot_date), 'ms').view('int64')
+
+    # ✅ One sort: customer segments with their invoices in date order
+    order = np.lexsort((ts, group))
+    group_s, ts_s = group[order], ts[order]
+    counts = np.bincount(group, minlength=n)
+    ends = np.cumsum(counts)
+    first_ts = ts_s[ends - counts]
+    last_ts = ts_s[ends - 1]
+
+    # ✅ Mean gap in whole days between consecutive invoice lines of a customer
+    same = group_s[1:] == group_s[:-1]
+    gap_days = (ts_s[1:] - ts_s[:-1])[same] // DAY_MS
+    gap_sum = np.bincount(group_s[1:][same], weights=gap_days, minlength=n)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        avg_interval = np.where(counts > 1, gap_sum / (counts - 1), 0.0)
+
+    monetary = _sum(group, df['TotalPrice'].to_numpy(), n)
+    total_quantity = np.bincount(group, weights=df['Quantity'].to_numpy(), minlength=n).astype('int64')
+    num_orders = _count_distinct(group, _codes(df['InvoiceNo']), n)
+    unique_products = _count_distinct(group, _codes(df['StockCode']), n)
+
+    recent = ts > snapshot - last_month_days * DAY_MS
+    last_month_spend = _sum(group[recent], df['TotalPrice'].to_numpy()[recent], n)
+
+    returns = np.bincount(group[is_cancelled(df['InvoiceNo']).to_numpy()], minlength=n)
+
+    # first non-missing country in file order, like groupby().first()
+    country_codes = _codes(df['Country'])
+    has_country = np.flatnonzero(country_codes >= 0)
+    first_group, first_pos = np.unique(group[has_country], return_index=True)
+    country = pd.Series(np.nan, index=range(n), dtype='object')
+    country.iloc[first_group] = df['Country'].to_numpy()[has_country[first_pos]]
+
+    features = pd.DataFrame({
+        'Recency': (snapshot - last_ts) // DAY_MS,
+        'CustomerTenure': (last_ts - first_ts) // DAY_MS,
+        'Frequency': counts,
+        'Monetary': monetary,
+        'UniqueProducts': unique_products,
+        'NumOrders': num_orders,
+        'TotalQuantity': total_quantity,
+    }, index=pd.Index(customers, name='CustomerID'))
+
+    features['AOV'] = features['Monetary'] / features['NumOrders']
+    features['AvgBasketSize'] = features['TotalQuantity'] / features['NumOrders']
+    features['Country'] = country.to_numpy()
+    features['AvgPurchaseInterval'] = avg_interval
+    features['LastMonthSpend'] = last_month_spend
+    features['ReturnRate'] = returns / counts
+    return features
@@ -0,0 +1,73 @@
+# src/dashboard_filters.py
+import pandas as pd
+import streamlit as st
+
+from src.artifacts import artifact_key
+from src.rollups import ensure_rollups, filter_rollup
+from src.store import build_store, load_transactions
+from src.time_index import load_time_index
+
+# the global date/country filters and the shared readers behind them, used by
+# both dashboard modes (app.py and simple_app.py)
+
+TRANSACTION_COLUMNS = ["InvoiceNo", "Quantity", "UnitPrice", "InvoiceDate", "CustomerID", "Country"]
+
+
+@st.cache_resource(max_entries=8)
+def read_rollup(path, build_key):
+    # pre-aggregated day x country x product measures (src/rollups.py), read-only
+    return pd.read_parquet(path)
+
+
+def load_rollup(raw_file, name):
+    # rollups are rebuilt only after the raw data changed
+    path = ensure_rollups(raw_file)[name]
+    return read_rollup(path, artifact_key(path))
+
+
+@st.cache_resource(max_entries=1, show_spinner="Loading transactions...")
+def read_transactions(raw_file, build_key):
+    # the date-sorted store and its date/country index (src/time_index.py);
+    # one copy per server process for both modes, read-only
+    return load_transactions(TRANSACTION_COLUMNS, raw_path=raw_file), load_time_index(raw_file)
+
+
+def load_filtered_transactions(raw_file, start, end, countries):
+    # rows come from binary searches on the index, not a mask over every row
+    raw, index = read_transactions(raw_file, artifact_key(build_store(raw_file)))
+    return index.select(raw, start, end, list(countries))
+
+
+def keep_filter(key):
+    # widget state is dropped while the other mode's page runs; keep a copy
+    st.session_state[key] = st.session_state["_" + key]
+
+
+def sidebar_filters(raw_file):
+    """
+    Draws the DATE RANGE / COUNTRIES sidebar filters and returns
+    (start, end, countries, filtered). The selection survives switching
+    modes; a selection without any transaction stops the page.
+    """
+    calendar = load_rollup(raw_file, "day_country")
+    first_day, last_day = calendar["Date"].min().date(), calendar["Date"].max().date()
+    all_countries = sorted(map(str, calendar["Country"].dropna().unique()))
+
+    # restore the selection made in either mode, clamped to the current data
+    saved_dates = st.session_state.get("filter_dates", (first_day, last_day))
+    st.session_state["_filter_dates"] = tuple(min(max(day, first_day), last_day) for day in saved_dates)
+    st.session_state["_filter_countries"] = [c for c in st.session_state.get("filter_countries", []) if c in all_countries]
+
+    st.sidebar.markdown("---")
+    st.sidebar.markdown("### FILTERS")
+    dates = st.sidebar.date_input("DATE RANGE", min_value=first_day, max_value=last_day,
+                                  key="_filter_dates", on_change=keep_filter, args=("filter_dates",))
+    countries = tuple(st.sidebar.multiselect("COUNTRIES", all_countries, placeholder="All countries",
+                                             key="_filter_countries", on_change=keep_filter, args=("filter_countries",)))
+    # while a range is being picked only its first day is set
+    start, end = (dates[0], dates[-1] if len(dates) == 2 else last_day) if dates else (first_day, last_day)
+
+    if filter_rollup(calendar, start, end, countries).empty:
+        st.warning("No transactions match the selected filters.")
+        st.stop()
+    return start, end, countries, (start, end) != (first_day, last_day) or bool(countries)
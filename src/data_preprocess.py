@@ -1,21 +1,24 @@
 # src/data_preprocess.py
-import pandas as pd
+
+from src.schema import apply_schema, is_cancelled
+from src.store import load_transactions
 
 def load_data(path='data/OnlineRetail.xlsx'):
-    df = pd.read_excel(path, engine='openpyxl')
+    # the workbook is parsed once into the columnar store (keyed on its hash)
+    df = load_transactions(raw_path=path)
     return df
 
 def clean_data(df):
+    # cast to the compact schema (categoricals, downcast numbers, parsed dates)
+    df = apply_schema(df)
     # drop rows without CustomerID
     df = df.dropna(subset=['CustomerID'])
     # remove cancelled transactions (InvoiceNo starting with 'C')
-    df = df[~df['InvoiceNo'].astype(str).str.startswith('C')]
+    df = df[~is_cancelled(df['InvoiceNo'])]
     # remove negative or zero quantity
     df = df[df['Quantity'] > 0]
     # create TotalPrice
     df['TotalPrice'] = df['Quantity'] * df['UnitPrice']
-    # convert InvoiceDate to datetime
-    df['InvoiceDate'] = pd.to_datetime(df['InvoiceDate'])
     return df
 
 if __name__ == "__main__":
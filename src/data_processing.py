@@ -1,43 +1,107 @@
 import pandas as pd
 import numpy as np
 import os
+import argparse
+import json
+import glob
 
-def generate_feature_dataset(input_file_path):
-    """
-    Reads the OnlineRetail dataset (.xlsx or .csv) and creates
-    processed_customer_data.csv with key business metrics per customer.
-    """
+from src.artifacts import file_sha256, is_fresh, write_manifest
+from src.store import CACHE_DIR, PROJECT_ROOT, load_transactions, iter_transactions, iter_raw
 
-    # ✅ Check if file exists
-    if not os.path.exists(input_file_path):
-        raise FileNotFoundError(f"❌ File not found: {input_file_path}")
+FEATURE_INPUT_COLUMNS = ['InvoiceDate', 'Quantity', 'UnitPrice', 'CustomerID', 'Country']
 
-    # ✅ Read dataset (supports Excel or CSV)
-    if input_file_path.endswith('.xlsx'):
-        df = pd.read_excel(input_file_path)
-    else:
-        df = pd.read_csv(input_file_path, encoding='latin1')
+OUTPUT_PATH = os.path.join(PROJECT_ROOT, 'processed_customer_data.csv')
+
+# bump when the columns or their definitions change, so old outputs are rebuilt
+FEATURES_VERSION = 'customer-features-v1'
 
-    print("✅ Raw OnlineRetail data loaded successfully!")
+# per-customer partial aggregates (and simulated columns) behind OUTPUT_PATH, the
+# source of truth for incremental updates. Stored as parquet parts: the full build
+# writes the first part and every appended file one more with only the customers it
+# touched; a customer's row in the latest part wins.
+STATE_DIR = os.path.join(CACHE_DIR, 'customer_state')
+STATE_LOG_PATH = os.path.join(CACHE_DIR, 'customer_state.json')
+# parts are merged back into one once there are more than this
+MAX_STATE_PARTS = 32
 
-    # ✅ Basic cleaning
-    df.dropna(subset=['CustomerID'], inplace=True)
-    df['InvoiceDate'] = pd.to_datetime(df['InvoiceDate'])
+SIMULATED_COLUMNS = ['ReturnRate', 'UniqueProducts', 'LastMonthSpend']
+
+
+def _clean_transactions(df):
+    df = df.dropna(subset=['CustomerID'])
     df['TotalPrice'] = df['Quantity'] * df['UnitPrice']
+    return df
+
 
-    # ✅ Group by customer and calculate metrics
-    features = df.groupby('CustomerID').agg({
-        'TotalPrice': ['sum', 'mean', 'count'],
-        'Quantity': 'mean',
-        'InvoiceDate': ['min', 'max'],
-        'Country': 'first'
+def _partial_aggregates(df):
+    """
+    Per-customer partial aggregates of one chunk of cleaned transactions.
+    Partials from different chunks are combined with _merge_partials.
+    """
+    partial = df.groupby('CustomerID').agg(
+        SpendSum=('TotalPrice', 'sum'),
+        SpendCount=('TotalPrice', 'count'),
+        QuantitySum=('Quantity', 'sum'),
+        QuantityCount=('Quantity', 'count'),
+        FirstPurchase=('InvoiceDate', 'min'),
+        LastPurchase=('InvoiceDate', 'max'),
+        Country=('Country', 'first'),
+    )
+    # chunks carry different category sets, so merge on plain strings
+    partial['QuantitySum'] = partial['QuantitySum'].astype('int64')
+    partial['Country'] = partial['Country'].astype('string')
+    return partial
+
+
+def _merge_partials(state, partial):
+    """
+    Merges two partial aggregates. `state` must hold the earlier rows so that
+    Country keeps the customer's first value.
+    """
+    if state is None:
+        return partial
+    return pd.concat([state, partial]).groupby(level=0).agg({
+        'SpendSum': 'sum',
+        'SpendCount': 'sum',
+        'QuantitySum': 'sum',
+        'QuantityCount': 'sum',
+        'FirstPurchase': 'min',
+        'LastPurchase': 'max',
+        'Country': 'first',
+    })
+
+
+def _finalize_partials(state):
+    """
+    Turns merged partial aggregates into the same columns the in-memory
+    groupby produces (mean = sum / count).
+    """
+    return pd.DataFrame({
+        'TotalSpend': state['SpendSum'],
+        'AOV': state['SpendSum'] / state['SpendCount'],
+        'NumOrders': state['SpendCount'],
+        'AvgBasketSize': state['QuantitySum'] / state['QuantityCount'],
+        'FirstPurchase': state['FirstPurchase'],
+        'LastPurchase': state['LastPurchase'],
+        'Country': state['Country'].astype('category'),
     })
 
-    # ✅ Flatten multi-index column names
-    features.columns = [
-        'TotalSpend', 'AOV', 'NumOrders', 'AvgBasketSize',
-        'FirstPurchase', 'LastPurchase', 'Country'
-    ]
+
+def _simulated(index):
+    # ✅ Example simulated features, drawn once per customer and kept in the state
+    return pd.DataFrame({
+        'ReturnRate': np.random.uniform(0, 10, len(index)),          # %
+        'UniqueProducts': np.random.randint(1, 25, len(index)),      # count
+        'LastMonthSpend': np.random.uniform(100, 1000, len(index)),  # $
+    }, index=index)
+
+
+def _feature_table(state):
+    """
+    Builds the processed_customer_data table from the per-customer state
+    (merged partial aggregates + simulated columns).
+    """
+    features = _finalize_partials(state)
 
     # ✅ Derived features
     features['CustomerTenure'] = (features['LastPurchase'] - features['FirstPurchase']).dt.days
@@ -46,37 +110,254 @@ def generate_feature_dataset(input_file_path):
         [np.inf, np.nan], features['PurchaseInterval'].mean()
     )
 
-    # ✅ Example simulated features
-    features['ReturnRate'] = np.random.uniform(0, 10, len(features))          # %
-    features['UniqueProducts'] = np.random.randint(1, 25, len(features))      # count
-    features['LastMonthSpend'] = np.random.uniform(100, 1000, len(features))  # $
+    features[SIMULATED_COLUMNS] = state[SIMULATED_COLUMNS]
 
     # ✅ Reset index for saving
     features.reset_index(inplace=True)
+    return features
+
+
+def _save_features(features, source, applied):
+    # ✅ Save processed dataset to project root (+ manifest of what it was built
+    # from: the raw file and the hashes of every file merged into the state)
+    tmp_path = OUTPUT_PATH + '.tmp'
+    features.to_csv(tmp_path, index=False)
+    os.replace(tmp_path, OUTPUT_PATH)
+    write_manifest(OUTPUT_PATH, [source], FEATURES_VERSION, params={'applied': applied})
+    print(f"✅ Processed dataset saved at: {os.path.abspath(OUTPUT_PATH)}")
+
+
+def _state_parts():
+    # oldest first; part numbers are zero-padded, so name order is write order
+    return sorted(glob.glob(os.path.join(STATE_DIR, 'part-*.parquet')))
+
+
+def _write_state_part(rows):
+    """Writes `rows` (per-customer state) as the newest part; returns its path."""
+    os.makedirs(STATE_DIR, exist_ok=True)
+    parts = _state_parts()
+    number = int(os.path.basename(parts[-1])[5:-8]) + 1 if parts else 0
+    path = os.path.join(STATE_DIR, f'part-{number:05d}.parquet')
+    tmp_path = path + '.tmp'
+    rows.reset_index().to_parquet(tmp_path, index=False)
+    os.replace(tmp_path, path)
+    return path
+
+
+def _save_state(state, source, applied):
+    # a full state replaces every earlier part (written first, so a crash in
+    # between only leaves parts it overrides)
+    old_parts = _state_parts()
+    _write_state_part(state)
+    for path in old_parts:
+        os.remove(path)
+    _save_log(source, applied)
+
+
+def _save_log(source, applied):
+    # the raw file behind the state and the hashes of every file merged into it
+    with open(STATE_LOG_PATH, 'w') as f:
+        json.dump({'source': os.path.abspath(source), 'applied': applied}, f, indent=2)
+
+
+def _read_state(customers=None):
+    """
+    The per-customer state from all parts, latest row per customer; with
+    `customers`, only their rows are read.
+    """
+    parts = _state_parts()
+    if not parts or not os.path.exists(STATE_LOG_PATH):
+        raise FileNotFoundError(
+            f"❌ No customer state in {STATE_DIR}. Run a full build first "
+            "(python -m src.data_processing)."
+        )
+    filters = [('CustomerID', 'in', list(customers))] if customers is not None else None
+    state = pd.concat([pd.read_parquet(path, filters=filters) for path in parts]).set_index('CustomerID')
+    return state[~state.index.duplicated(keep='last')].sort_index()
+
+
+def _read_log():
+    with open(STATE_LOG_PATH) as f:
+        log = json.load(f)
+    return log['source'], log['applied']
+
 
-    # ✅ Save processed dataset to project root
-    output_path = os.path.join(os.path.dirname(__file__), '..', 'processed_customer_data.csv')
-    features.to_csv(output_path, index=False)
+def load_feature_dataset():
+    """The current processed_customer_data table, built from the persisted state."""
+    return _feature_table(_read_state())
 
-    print(f"✅ Processed dataset saved at: {os.path.abspath(output_path)}")
+
+def export_feature_dataset():
+    """
+    Rewrites processed_customer_data.csv from the persisted state, e.g.
+    once after a batch of appended files.
+    """
+    source, applied = _read_log()
+    features = load_feature_dataset()
+    _save_features(features, source, applied)
+    return features
+
+
+def _current_applied(input_file_path):
+    """
+    Hashes of the files behind the current features of `input_file_path`:
+    the persisted state's log (raw file + appended deltas) when the state was
+    built from this very file, otherwise just the file itself.
+    """
+    if not os.path.exists(input_file_path):
+        return []
+    source_hash = file_sha256(input_file_path)
+    if _state_parts() and os.path.exists(STATE_LOG_PATH):
+        source, applied = _read_log()
+        if source == os.path.abspath(input_file_path) and applied[:1] == [source_hash]:
+            return applied
+    return [source_hash]
+
+
+def generate_feature_dataset(input_file_path, chunksize=None):
+    """
+    Reads the OnlineRetail dataset (.xlsx or .csv) and creates
+    processed_customer_data.csv with key business metrics per customer.
+
+    With `chunksize`, the transactions are streamed in chunks of that many rows
+    and only per-customer partial aggregates are kept in memory.
+    The per-customer state is persisted so later days can be added with
+    update_feature_dataset instead of a full rebuild.
+    """
+
+    # ✅ Check if file exists
+    if not os.path.exists(input_file_path):
+        raise FileNotFoundError(f"❌ File not found: {input_file_path}")
+
+    if chunksize:
+        # ✅ Stream the dataset and merge per-customer partial aggregates
+        state = None
+        for chunk in iter_transactions(FEATURE_INPUT_COLUMNS, raw_path=input_file_path, chunksize=chunksize):
+            state = _merge_partials(state, _partial_aggregates(_clean_transactions(chunk)))
+
+        print("✅ Raw OnlineRetail data streamed successfully!")
+
+    else:
+        # ✅ Read dataset (Excel or CSV, converted once into the columnar store)
+        df = load_transactions(FEATURE_INPUT_COLUMNS, raw_path=input_file_path)
+
+        print("✅ Raw OnlineRetail data loaded successfully!")
+
+        # ✅ Basic cleaning + group by customer
+        state = _partial_aggregates(_clean_transactions(df))
+
+    state[SIMULATED_COLUMNS] = _simulated(state.index)
+    applied = [file_sha256(input_file_path)]
+    _save_state(state, input_file_path, applied)
+
+    features = _feature_table(state)
+    _save_features(features, input_file_path, applied)
     return features
 
 
+def ensure_feature_dataset(input_file_path, chunksize=None, force=False):
+    """
+    Returns processed_customer_data.csv, rebuilding it only when the input's
+    content, the files appended to its state or FEATURES_VERSION changed
+    since the last build. After appends the CSV is re-exported from the
+    state, which keeps the appended transactions.
+    """
+    applied = _current_applied(input_file_path)
+    if not force and is_fresh(OUTPUT_PATH, [input_file_path], FEATURES_VERSION, params={'applied': applied}):
+        print(f"♻️ {os.path.basename(OUTPUT_PATH)} is up to date — reusing it.")
+        return pd.read_csv(OUTPUT_PATH)
+    if not force and len(applied) > 1:
+        print(f"🔄 {len(applied) - 1} appended file(s) since the last export — re-exporting from the customer state.")
+        return export_feature_dataset()
+    return generate_feature_dataset(input_file_path, chunksize=chunksize)
+
+
+def update_feature_dataset(delta_file_path):
+    """
+    Adds a file of new transactions (e.g. one day of invoices) to the
+    persisted per-customer state. Only the customers that appear in the delta
+    are read, re-aggregated and written (as a new state part), so the cost
+    depends on the delta size, not on the history or the number of customers.
+    processed_customer_data.csv is left as it is; refresh it with
+    export_feature_dataset. Returns the updated customers' state rows.
+    """
+    if not os.path.exists(delta_file_path):
+        raise FileNotFoundError(f"❌ File not found: {delta_file_path}")
+
+    source, applied = _read_log()
+
+    delta_hash = file_sha256(delta_file_path)
+    if delta_hash in applied:
+        print(f"⚠️ {delta_file_path} was already applied — skipping.")
+        return None
+
+    # ✅ Aggregate only the new transactions
+    delta = None
+    for chunk in iter_raw(delta_file_path):
+        chunk = _clean_transactions(chunk[FEATURE_INPUT_COLUMNS])
+        delta = _merge_partials(delta, _partial_aggregates(chunk))
+
+    if delta is None or delta.empty:
+        # nothing to merge (no rows, or none with a CustomerID); don't apply it again
+        print(f"⚠️ {delta_file_path} has no customer transactions — nothing to update.")
+        _save_log(source, applied + [delta_hash])
+        return None
+
+    # ✅ Merge the delta into the affected customers only
+    affected = delta.index
+    existing = _read_state(affected)
+    merged = _merge_partials(existing.drop(columns=SIMULATED_COLUMNS), delta)
+    # existing customers keep their simulated columns, new ones get fresh values
+    simulated = _simulated(merged.index)
+    simulated.loc[existing.index] = existing[SIMULATED_COLUMNS]
+    merged[SIMULATED_COLUMNS] = simulated
+
+    print(f"✅ {len(affected):,} customers updated ({(~affected.isin(existing.index)).sum():,} new)")
+
+    if len(_state_parts()) >= MAX_STATE_PARTS:
+        # compact: one full part instead of a long chain of small ones
+        state = _read_state()
+        _save_state(pd.concat([state[~state.index.isin(affected)], merged]).sort_index(),
+                    source, applied + [delta_hash])
+    else:
+        _write_state_part(merged)
+        _save_log(source, applied + [delta_hash])
+    return merged
+
+
 # ------------------------------------------------------------
 # 🚀 MAIN EXECUTION
 # ------------------------------------------------------------
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build processed_customer_data.csv")
+    parser.add_argument('--chunksize', type=int, default=None,
+                        help="stream the input in chunks of this many rows (bounded memory)")
+    parser.add_argument('--append', metavar='FILE', nargs='+', default=None,
+                        help="add files of new transactions to the existing customer state")
+    parser.add_argument('--export', action='store_true',
+                        help="rewrite processed_customer_data.csv from the customer state (after --append)")
+    parser.add_argument('--force', action='store_true',
+                        help="rebuild even if the output is up to date")
+    args = parser.parse_args()
+
     base_path = os.path.join(os.path.dirname(__file__), '..', 'data')
     excel_path = os.path.join(base_path, 'OnlineRetail.xlsx')
     csv_path = os.path.join(base_path, 'OnlineRetail.csv')
 
-    if os.path.exists(excel_path):
+    if args.append or args.export:
+        for path in args.append or []:
+            print(f"📥 Appending new transactions from {path}...")
+            update_feature_dataset(path)
+        if args.export:
+            export_feature_dataset()
+
+    elif os.path.exists(excel_path):
         print("📘 Found OnlineRetail.xlsx — loading Excel dataset...")
-        generate_feature_dataset(excel_path)
+        ensure_feature_dataset(excel_path, chunksize=args.chunksize, force=args.force)
 
     elif os.path.exists(csv_path):
         print("📗 Found OnlineRetail.csv — loading CSV dataset...")
-        generate_feature_dataset(csv_path)
+        ensure_feature_dataset(csv_path, chunksize=args.chunksize, force=args.force)
 
     else:
         print("⚠️ Please place your OnlineRetail.xlsx or OnlineRetail.csv inside the 'data' folder.")
@@ -1,5 +1,7 @@
 # src/features.py
+import numbers
 import pandas as pd
+import numpy as np
 import datetime as dt
 
 def create_rfm(df, cutoff_date):
@@ -19,6 +21,88 @@ def create_label(df, cutoff_date, label_window_days=30):
     buyers = future_df['CustomerID'].unique()
     return buyers
 
+def create_rfm_panel(df, cutoff_dates, label_window_days=30):
+    """
+    Stacked create_rfm + create_label snapshots for many cutoffs at once.
+
+    The transactions are sorted by date once and swept forward, keeping running
+    per-customer state (last purchase, distinct invoices, spend), so the cost is
+    one pass over the rows plus O(customers) per cutoff instead of a full
+    filter + groupby per cutoff.
+
+    `label_window_days` is an int (-> NextMonthPurchase column, like the
+    single-cutoff pipeline) or a list of ints (-> one Purchased<N>d column each).
+    Returns CutoffDate, CustomerID, Recency, Frequency, Monetary + label column(s);
+    no transactions or no cutoffs give an empty panel with those columns.
+    """
+    df = df.dropna(subset=['CustomerID', 'InvoiceDate'])
+    cutoffs = pd.DatetimeIndex(sorted(pd.to_datetime(list(cutoff_dates))))
+    if isinstance(label_window_days, numbers.Integral):
+        windows = {'NextMonthPurchase': int(label_window_days)}
+    else:
+        windows = {f'Purchased{days}d': int(days) for days in label_window_days}
+
+    if df.empty or cutoffs.empty:
+        return pd.DataFrame({
+            'CutoffDate': pd.Series(dtype=cutoffs.dtype),
+            'CustomerID': pd.Series(dtype=df['CustomerID'].dtype),
+            'Recency': pd.Series(dtype='int64'),
+            'Frequency': pd.Series(dtype='int64'),
+            'Monetary': pd.Series(dtype='float64'),
+            **{column: pd.Series(dtype='int64') for column in windows},
+        })
+
+    # ✅ One date sort; everything below works on the sorted arrays
+    ts = df['InvoiceDate'].to_numpy(dtype='datetime64[ns]')
+    order = np.argsort(ts, kind='stable')
+    ts = ts[order]
+    group, customers = pd.factorize(df['CustomerID'], sort=True)
+    group = group[order]
+    spend = np.nan_to_num(df['TotalPrice'].to_numpy(dtype='float64'))[order]
+    invoice = pd.factorize(df['InvoiceNo'])[0][order]
+
+    # first line (in date order) of each customer's invoice -> counts as a new invoice
+    _, first_idx = np.unique(group.astype('int64') * (invoice.max() + 1) + invoice, return_index=True)
+    new_invoice = np.zeros(len(ts), dtype=bool)
+    new_invoice[first_idx] = True
+
+    n = len(customers)
+    monetary = np.zeros(n)
+    frequency = np.zeros(n, dtype='int64')
+    last_purchase = np.full(n, np.datetime64('NaT'), dtype='datetime64[ns]')
+
+    panels = []
+    start = 0
+    for cutoff in cutoffs:
+        # ✅ Fold the rows up to this cutoff into the running state
+        end = np.searchsorted(ts, cutoff.to_datetime64(), side='right')
+        block = slice(start, end)
+        monetary += np.bincount(group[block], weights=spend[block], minlength=n)
+        frequency += np.bincount(group[block][new_invoice[block]], minlength=n)
+        last_purchase[group[block]] = ts[block]   # sorted, so the last write is the latest date
+        start = end
+
+        seen = np.flatnonzero(~np.isnat(last_purchase))
+        snapshot_date = cutoff + pd.Timedelta(days=1)
+        panel = pd.DataFrame({
+            'CutoffDate': cutoff,
+            'CustomerID': customers[seen],
+            'Recency': (snapshot_date - pd.DatetimeIndex(last_purchase[seen])).days,
+            'Frequency': frequency[seen],
+            'Monetary': monetary[seen],
+        })
+
+        # ✅ Labels: who bought in (cutoff, cutoff + window]
+        for column, days in windows.items():
+            window_end = np.searchsorted(ts, (cutoff + pd.Timedelta(days=days)).to_datetime64(), side='right')
+            bought = np.zeros(n, dtype=bool)
+            bought[group[end:window_end]] = True
+            panel[column] = bought[seen].astype(int)
+
+        panels.append(panel)
+
+    return pd.concat(panels, ignore_index=True)
+
 if __name__ == "__main__":
     df = pd.read_csv('data/clean_retail.csv', parse_dates=['InvoiceDate'])
     cutoff_date = '2010-12-31'   # example: change based on your data
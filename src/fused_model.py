@@ -0,0 +1,75 @@
+# src/fused_model.py
+import math
+
+import numpy as np
+
+
+class FusedLogit:
+    """
+    StandardScaler + binary LogisticRegression folded into one linear model:
+
+        z = ((x - mean) / scale) @ coef + intercept
+          = x @ (coef / scale) + (intercept - sum(coef * mean / scale))
+
+    Scoring is a single dot product in plain NumPy - no sklearn import and no
+    input validation - so it is cheap enough to call per event.
+    """
+
+    def __init__(self, weights, bias, classes=(0, 1), feature_names=None, version=None):
+        self.weights = np.ascontiguousarray(weights, dtype='float64')
+        self.bias = float(bias)
+        self.classes = np.asarray(classes)
+        self.feature_names = list(feature_names) if feature_names is not None else None
+        self.version = version
+
+    @classmethod
+    def from_sklearn(cls, model, scaler, feature_names=None, version=None):
+        coef = np.asarray(model.coef_, dtype='float64').ravel()
+        if coef.shape[0] != scaler.n_features_in_:
+            raise ValueError(
+                f"model has {coef.shape[0]} coefficients but the scaler expects "
+                f"{scaler.n_features_in_} features"
+            )
+        mean = scaler.mean_ if scaler.mean_ is not None else np.zeros_like(coef)
+        scale = scaler.scale_ if scaler.scale_ is not None else np.ones_like(coef)
+        weights = coef / scale
+        bias = float(model.intercept_[0]) - float(np.dot(weights, mean))
+        if feature_names is None and hasattr(scaler, 'feature_names_in_'):
+            feature_names = scaler.feature_names_in_
+        return cls(weights, bias, model.classes_, feature_names, version)
+
+    def decision_function(self, X):
+        return np.asarray(X, dtype='float64') @ self.weights + self.bias
+
+    def predict(self, X):
+        """(probabilities, labels) for a 2-D array of raw (unscaled) features."""
+        scores = self.decision_function(X)
+        # sigmoid written as exp(-log(1 + e^-z)) so large |z| cannot overflow
+        return np.exp(-np.logaddexp(0.0, -scores)), self.classes[(scores > 0).astype(int)]
+
+    def predict_one(self, row):
+        """(label, probability) for a single raw feature row."""
+        score = float(np.dot(self.weights, np.asarray(row, dtype='float64'))) + self.bias
+        if score >= 0:
+            probability = 1.0 / (1.0 + math.exp(-score))
+        else:
+            probability = math.exp(score) / (1.0 + math.exp(score))
+        return self.classes[int(score > 0)], probability
+
+    def save(self, path):
+        # a file object, so np.savez doesn't append .npz to a temp path
+        with open(path, 'wb') as f:
+            np.savez(
+                f, weights=self.weights, bias=np.float64(self.bias), classes=self.classes,
+                feature_names=np.asarray(self.feature_names or [], dtype=str),
+                version=np.asarray(self.version or ''),
+            )
+
+    @classmethod
+    def load(cls, path):
+        """Reads a saved kernel: a few arrays, no pickle and no sklearn import."""
+        with np.load(path, allow_pickle=False) as data:
+            names = [str(name) for name in data['feature_names']] or None
+            version = str(data['version']) if 'version' in data.files else ''
+            return cls(data['weights'], data['bias'], data['classes'], names, version or None)
+
@@ -0,0 +1,232 @@
+# src/incremental_train.py
+import os
+import glob
+import argparse
+import hashlib
+import tempfile
+from datetime import datetime
+
+import joblib
+import numpy as np
+import pandas as pd
+from pandas.api.types import union_categoricals
+from sklearn.linear_model import SGDClassifier
+from sklearn.metrics import roc_auc_score
+from sklearn.preprocessing import StandardScaler
+
+from src.customer_features import FEATURE_COLUMNS, build_customer_features
+from src.model_bundle import MODEL_DIR, ModelBundle, data_fingerprint
+from src.store import CACHE_DIR, DEFAULT_CHUNKSIZE, iter_transactions
+
+TARGET = 'PurchasedAgain'
+CHECKPOINT_PATH = os.path.join(MODEL_DIR, 'propensity_sgd.ckpt.joblib')
+BUNDLE_PATH = os.path.join(MODEL_DIR, 'propensity_bundle.joblib')
+
+TRANSACTION_COLUMNS = ['InvoiceNo', 'StockCode', 'Quantity', 'InvoiceDate', 'UnitPrice', 'CustomerID', 'Country']
+
+
+def _label(features):
+    # same target as model_train.py: bought again within 30 days of the snapshot
+    features[TARGET] = np.where(features['Recency'] <= 30, 1, 0)
+    return features
+
+
+def _concat_chunks(chunks):
+    # every store chunk has its own category set; union them first, or
+    # pd.concat falls back to object columns
+    for column in chunks[0].columns:
+        if isinstance(chunks[0][column].dtype, pd.CategoricalDtype):
+            categories = union_categoricals([chunk[column] for chunk in chunks]).categories
+            for chunk in chunks:
+                chunk[column] = chunk[column].cat.set_categories(categories)
+    return pd.concat(chunks, ignore_index=True)
+
+
+def iter_customer_feature_batches(raw_path=None, n_partitions=8, snapshot_date=None,
+                                  chunksize=DEFAULT_CHUNKSIZE):
+    """
+    Yields labelled customer feature frames, one per CustomerID partition.
+
+    One streamed pass over the transaction store spills each chunk's rows
+    into per-partition parquet shards (a temp dir under CACHE_DIR); each
+    partition is then built from its own shards, so the store is read once
+    and at most ~1/n_partitions of the history is in memory at a time. All
+    partitions share one snapshot date (default: the day after the last
+    customer invoice, as in model_train.py).
+    """
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    with tempfile.TemporaryDirectory(dir=CACHE_DIR, prefix='feature_partitions.') as shard_dir:
+        last = None
+        for number, chunk in enumerate(iter_transactions(TRANSACTION_COLUMNS, raw_path, chunksize)):
+            chunk = chunk.dropna(subset=['CustomerID'])
+            if chunk.empty:
+                continue
+            chunk_last = chunk['InvoiceDate'].max()
+            last = chunk_last if last is None else max(last, chunk_last)
+            partition = chunk['CustomerID'].to_numpy() % n_partitions
+            for part in np.unique(partition):
+                chunk[partition == part].to_parquet(
+                    os.path.join(shard_dir, f'part{part}-{number:06d}.parquet'), index=False)
+
+        if snapshot_date is None and last is not None:
+            snapshot_date = last + pd.Timedelta(days=1)
+
+        for part in range(n_partitions):
+            shards = sorted(glob.glob(os.path.join(shard_dir, f'part{part}-*.parquet')))
+            if not shards:
+                continue
+            df = _concat_chunks([pd.read_parquet(path) for path in shards])
+            df['TotalPrice'] = df['Quantity'] * df['UnitPrice']
+            yield _label(build_customer_features(df, snapshot_date=snapshot_date))
+
+
+def iter_feature_file_batches(path, batch_size=50_000):
+    """
+    Yields batches from a customer feature file (CSV or parquet) that already
+    holds FEATURE_COLUMNS and the target, e.g. the customers of a new week.
+    """
+    if path.endswith('.parquet'):
+        import pyarrow.parquet as pq
+        for batch in pq.ParquetFile(path).iter_batches(batch_size=batch_size):
+            yield batch.to_pandas()
+    else:
+        yield from pd.read_csv(path, chunksize=batch_size)
+
+
+class IncrementalTrainer:
+    """
+    Trains the propensity model one batch at a time: StandardScaler keeps a
+    running mean/variance (partial_fit) and an SGD logistic regression
+    (log loss) takes one partial_fit step per batch.
+
+    State is checkpointed every `checkpoint_every` batches, so a run can be
+    resumed after a crash, or continued later on new data without refitting.
+    """
+
+    def __init__(self, feature_columns=FEATURE_COLUMNS, target=TARGET,
+                 checkpoint_path=CHECKPOINT_PATH, alpha=1e-4, random_state=42):
+        self.feature_columns = list(feature_columns)
+        self.target = target
+        self.checkpoint_path = checkpoint_path
+        self.scaler = StandardScaler()
+        self.model = SGDClassifier(loss='log_loss', alpha=alpha, random_state=random_state)
+        self.batches_seen = 0
+        self.rows_seen = 0
+        # hash chain over the batch fingerprints, i.e. over all data trained on
+        self.fingerprint = hashlib.sha256().hexdigest()
+        self.history = []
+
+    def _prepare(self, batch):
+        X = batch[self.feature_columns].replace([np.inf, -np.inf], np.nan).fillna(0).astype('float64')
+        return X, batch[self.target].to_numpy()
+
+    def partial_fit(self, batch):
+        """One training step. Returns the batch's progressive ROC-AUC (scored before fitting)."""
+        X, y = self._prepare(batch)
+        auc = None
+        if self.batches_seen and len(np.unique(y)) == 2:
+            # test-then-train: the model has not seen this batch yet
+            auc = roc_auc_score(y, self.model.decision_function(self.scaler.transform(X)))
+
+        self.scaler.partial_fit(X)
+        self.model.partial_fit(self.scaler.transform(X), y, classes=np.array([0, 1]))
+
+        self.batches_seen += 1
+        self.rows_seen += len(X)
+        self.fingerprint = hashlib.sha256((self.fingerprint + data_fingerprint(X)).encode()).hexdigest()
+        self.history.append({'batch': self.batches_seen, 'rows': len(X), 'auc': auc})
+        return auc
+
+    def fit(self, batches, checkpoint_every=1, skip=0):
+        """
+        Trains on every batch of the iterable, checkpointing as it goes.
+        `skip` drops that many leading batches (already trained on before a restart).
+        """
+        for i, batch in enumerate(batches):
+            if i < skip:
+                continue
+            auc = self.partial_fit(batch)
+            auc_text = f"{auc:.4f}" if auc is not None else "n/a"
+            print(f"📦 Batch {self.batches_seen}: {len(batch):,} rows "
+                  f"(total {self.rows_seen:,}), progressive ROC-AUC {auc_text}")
+            if self.checkpoint_path and self.batches_seen % checkpoint_every == 0:
+                self.save_checkpoint()
+        if self.checkpoint_path:
+            self.save_checkpoint()
+        return self
+
+    def save_checkpoint(self):
+        state = {
+            'feature_columns': self.feature_columns,
+            'target': self.target,
+            'scaler': self.scaler,
+            'model': self.model,
+            'batches_seen': self.batches_seen,
+            'rows_seen': self.rows_seen,
+            'fingerprint': self.fingerprint,
+            'history': self.history,
+        }
+        tmp_path = self.checkpoint_path + '.tmp'
+        joblib.dump(state, tmp_path)
+        os.replace(tmp_path, self.checkpoint_path)
+
+    @classmethod
+    def resume(cls, checkpoint_path=CHECKPOINT_PATH):
+        """Trainer restored from a checkpoint (a fresh one if there is none yet)."""
+        if not os.path.exists(checkpoint_path):
+            return cls(checkpoint_path=checkpoint_path)
+        state = joblib.load(checkpoint_path)
+        trainer = cls(state['feature_columns'], state['target'], checkpoint_path)
+        trainer.scaler, trainer.model = state['scaler'], state['model']
+        trainer.batches_seen, trainer.rows_seen = state['batches_seen'], state['rows_seen']
+        trainer.fingerprint, trainer.history = state['fingerprint'], state['history']
+        return trainer
+
+    def to_bundle(self):
+        now = datetime.now()
+        aucs = [h['auc'] for h in self.history if h['auc'] is not None]
+        return ModelBundle(
+            self.model, self.scaler, self.feature_columns,
+            data_fingerprint=self.fingerprint,
+            version=f"{now:%Y%m%d%H%M%S}-{self.fingerprint[:8]}",
+            created_at=now.isoformat(timespec='seconds'),
+            metrics={
+                'batches': self.batches_seen,
+                'rows': self.rows_seen,
+                'progressive_roc_auc': float(np.mean(aucs)) if aucs else None,
+            },
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Streaming incremental training of the propensity model")
+    parser.add_argument('--raw', default=None, help="raw transactions file (default: data/OnlineRetail.*)")
+    parser.add_argument('--features', default=None,
+                        help="train on a labelled customer feature file (CSV/parquet) instead of the raw data")
+    parser.add_argument('--partitions', type=int, default=8, help="customer partitions streamed from the raw data")
+    parser.add_argument('--batch-size', type=int, default=50_000, help="rows per batch for --features")
+    parser.add_argument('--checkpoint', default=CHECKPOINT_PATH)
+    parser.add_argument('--checkpoint-every', type=int, default=1)
+    parser.add_argument('--bundle', default=BUNDLE_PATH, help="where to write the trained model bundle")
+    parser.add_argument('--resume', action='store_true',
+                        help="continue from the checkpoint (e.g. to add new data) instead of starting over")
+    parser.add_argument('--skip-seen', action='store_true',
+                        help="with --resume: skip the batches the checkpoint already trained on (restart after a crash)")
+    args = parser.parse_args()
+
+    os.makedirs(os.path.dirname(args.checkpoint) or '.', exist_ok=True)
+    trainer = IncrementalTrainer.resume(args.checkpoint) if args.resume else IncrementalTrainer(checkpoint_path=args.checkpoint)
+    if trainer.batches_seen:
+        print(f"♻️ Resuming after {trainer.batches_seen} batches ({trainer.rows_seen:,} rows)")
+
+    if args.features:
+        batches = iter_feature_file_batches(args.features, args.batch_size)
+    else:
+        batches = iter_customer_feature_batches(args.raw, args.partitions)
+    skip = trainer.batches_seen if args.resume and args.skip_seen else 0
+    trainer.fit(batches, args.checkpoint_every, skip=skip)
+
+    bundle = trainer.to_bundle()
+    bundle.save(args.bundle)
+    print(f"✅ Model bundle {bundle.version} saved at: {args.bundle}")
+    print("🎉 Incremental training complete!")
@@ -4,10 +4,15 @@ from sklearn.model_selection import train_test_split
 from sklearn.preprocessing import StandardScaler
 from sklearn.linear_model import LogisticRegression
 from sklearn.metrics import classification_report, confusion_matrix, roc_auc_score
-import joblib
 
-def train_model(path='data/rfm_labeled.csv'):
-    df = pd.read_csv(path)
+import os
+
+from src.model_bundle import MODEL_DIR, save_bundle
+
+RFM_BUNDLE_PATH = os.path.join(MODEL_DIR, 'rfm_bundle.joblib')
+
+def train_model(path='data/rfm_labeled.csv', bundle_path=RFM_BUNDLE_PATH, fused=True):
+    df = pd.read_parquet(path) if path.endswith('.parquet') else pd.read_csv(path)
     X = df[['Recency','Frequency','Monetary']]
     y = df['NextMonthPurchase']
 
@@ -29,11 +34,14 @@ def train_model(path='data/rfm_labeled.csv'):
 
     print(classification_report(y_test, y_pred))
     print("Confusion Matrix:\n", confusion_matrix(y_test, y_pred))
-    print("ROC-AUC:", roc_auc_score(y_test, y_proba))
-
-    # save model and scaler
-    joblib.dump(model, 'model/logistic_model.joblib')
-    joblib.dump(scaler, 'model/scaler.joblib')
+    auc = roc_auc_score(y_test, y_proba)
+    print("ROC-AUC:", auc)
+
+    # model + scaler + feature schema in one versioned file (and the fused kernel
+    # next to it); kept apart from the 11-feature propensity model that model_train.py writes
+    bundle = save_bundle(bundle_path, model, scaler, X, metrics={'roc_auc': float(auc)}, fused=fused)
+    print(f"✅ RFM model bundle {bundle.version} saved at: {bundle_path}")
+    return bundle
 
 if __name__ == "__main__":
     train_model()
@@ -0,0 +1,205 @@
+# src/model_bundle.py
+import os
+import hashlib
+import threading
+from datetime import datetime
+
+import joblib
+import numpy as np
+import pandas as pd
+
+from src.artifacts import atomic_write
+from src.fused_model import FusedLogit
+
+# bump when the on-disk layout of a bundle changes
+BUNDLE_FORMAT = 1
+
+# where every trained model and its reports live, relative to the project
+# (not the working directory), so any entry point finds the same files
+MODEL_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'model'))
+
+
+def fused_path(bundle_path):
+    """The bundle's fused NumPy kernel (FusedLogit.save), exported next to it."""
+    return os.path.splitext(bundle_path)[0] + '.fused.npz'
+
+
+def data_fingerprint(X):
+    """
+    SHA-256 of a training matrix (column names + values), stored in the bundle
+    so a model can be traced back to the exact data it was fitted on.
+    """
+    digest = hashlib.sha256()
+    digest.update(','.join(map(str, X.columns)).encode())
+    digest.update(pd.util.hash_pandas_object(X, index=False).to_numpy().tobytes())
+    return digest.hexdigest()
+
+
+class ModelBundle:
+    """
+    A fitted scaler + model together with the feature schema they expect
+    (names, order, dtypes), the training data fingerprint and a version.
+    """
+
+    def __init__(self, model, scaler, feature_names, feature_dtypes=None,
+                 data_fingerprint=None, version=None, created_at=None, metrics=None):
+        self.model = model
+        self.scaler = scaler
+        self.feature_names = list(feature_names)
+        self.feature_dtypes = dict(feature_dtypes or {name: 'float64' for name in self.feature_names})
+        self.data_fingerprint = data_fingerprint
+        self.version = version
+        self.created_at = created_at
+        self.metrics = dict(metrics or {})
+        self.fused = FusedLogit.from_sklearn(model, scaler, self.feature_names, version)
+
+    @classmethod
+    def from_training_data(cls, model, scaler, X, metrics=None):
+        """Bundle for a model fitted on the DataFrame X (before scaling)."""
+        now = datetime.now()
+        fingerprint = data_fingerprint(X)
+        return cls(
+            model, scaler,
+            feature_names=list(X.columns),
+            feature_dtypes={col: str(dtype) for col, dtype in X.dtypes.items()},
+            data_fingerprint=fingerprint,
+            # sortable by training time, distinguishable by training data
+            version=f"{now:%Y%m%d%H%M%S}-{fingerprint[:8]}",
+            created_at=now.isoformat(timespec='seconds'),
+            metrics=metrics,
+        )
+
+    def select(self, data):
+        """
+        Returns the model input as a float array in the bundle's feature order.
+        DataFrames are matched by column name; arrays must already be in order.
+        """
+        if isinstance(data, pd.DataFrame):
+            missing = [name for name in self.feature_names if name not in data.columns]
+            if missing:
+                raise ValueError(f"missing features for model {self.version}: {missing}")
+            return data[self.feature_names].to_numpy(dtype='float64')
+
+        X = np.atleast_2d(np.asarray(data, dtype='float64'))
+        if X.shape[1] != len(self.feature_names):
+            raise ValueError(
+                f"model {self.version} expects {len(self.feature_names)} features "
+                f"{self.feature_names}, got {X.shape[1]}"
+            )
+        return X
+
+    def predict(self, data):
+        """(probabilities, labels) through the fused NumPy kernel."""
+        return self.fused.predict(self.select(data))
+
+    def save(self, path, fused=True):
+        """
+        Writes the bundle and, with `fused`, its fused kernel to fused_path(path)
+        for scorers that don't need sklearn. The kernel goes first, so it is never
+        older than the bundle a watcher sees.
+        """
+        if fused:
+            atomic_write(fused_path(path), self.fused.save)
+        payload = {
+            'format': BUNDLE_FORMAT,
+            'version': self.version,
+            'created_at': self.created_at,
+            'feature_names': self.feature_names,
+            'feature_dtypes': self.feature_dtypes,
+            'data_fingerprint': self.data_fingerprint,
+            'metrics': self.metrics,
+            'scaler': self.scaler,
+            'model': self.model,
+        }
+        # write + rename, so a process watching the file never loads half a bundle
+        atomic_write(path, lambda tmp_path: joblib.dump(payload, tmp_path))
+
+    @classmethod
+    def load(cls, path, mmap_mode='r'):
+        payload = joblib.load(path, mmap_mode=mmap_mode)
+        if payload.get('format') != BUNDLE_FORMAT:
+            raise ValueError(f"{path}: unsupported bundle format {payload.get('format')}")
+        return cls(
+            payload['model'], payload['scaler'], payload['feature_names'],
+            feature_dtypes=payload['feature_dtypes'],
+            data_fingerprint=payload['data_fingerprint'],
+            version=payload['version'],
+            created_at=payload['created_at'],
+            metrics=payload.get('metrics'),
+        )
+
+
+def save_bundle(path, model, scaler, X, metrics=None, fused=True):
+    """
+    Saves model + scaler + X's feature schema and fingerprint as one versioned
+    file, plus (with `fused`) the fused kernel next to it.
+    """
+    bundle = ModelBundle.from_training_data(model, scaler, X, metrics=metrics)
+    bundle.save(path, fused=fused)
+    return bundle
+
+
+class HotBundle:
+    """
+    Keeps the latest version of a bundle file loaded for a long-running process.
+
+    `current` is a plain reference swap: callers take it once per unit of work,
+    so scoring that is already in flight finishes on the bundle it started
+    with while new work picks up the replacement. refresh() reloads when the
+    file changed; watch() does that from a background thread. `load` reads the
+    file (ModelBundle.load; FusedLogit.load for an exported kernel).
+    """
+
+    def __init__(self, path, poll_interval=2.0, load=None):
+        self.path = os.path.abspath(path)
+        self.poll_interval = poll_interval
+        self._load = load or ModelBundle.load
+        self._lock = threading.Lock()
+        self._bundle = None
+        self._stamp = None
+        self._stop = threading.Event()
+        self._thread = None
+
+    def _file_stamp(self):
+        stat = os.stat(self.path)
+        return stat.st_mtime_ns, stat.st_size
+
+    @property
+    def current(self):
+        bundle = self._bundle
+        if bundle is None:
+            self.refresh()
+            bundle = self._bundle
+        return bundle
+
+    def refresh(self, force=False):
+        """Loads the file if it changed since the last load. Returns True on a swap."""
+        stamp = self._file_stamp()
+        if not force and stamp == self._stamp:
+            return False
+        with self._lock:
+            if not force and stamp == self._stamp:
+                return False
+            bundle = self._load(self.path)
+            self._bundle, self._stamp = bundle, stamp
+        return True
+
+    def watch(self, poll_interval=None):
+        """Starts a daemon thread that calls refresh() every `poll_interval` seconds."""
+        if poll_interval is not None:
+            self.poll_interval = poll_interval
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._watch_loop, name='bundle-watcher', daemon=True)
+            self._thread.start()
+
+    def _watch_loop(self):
+        while not self._stop.wait(self.poll_interval):
+            try:
+                if os.path.exists(self.path) and self.refresh():
+                    print(f"🔄 Loaded model bundle {self._bundle.version} from {self.path}")
+            except Exception as e:
+                # keep serving the previous version if the new file can't be read
+                print(f"⚠️ Could not reload {self.path}: {e}")
+
+    def stop(self):
+        self._stop.set()
@@ -0,0 +1,180 @@
+# src/model_search.py
+import os
+import time
+import shutil
+import argparse
+import itertools
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+from sklearn.linear_model import LogisticRegression
+from sklearn.metrics import accuracy_score, f1_score, log_loss, roc_auc_score
+from sklearn.model_selection import StratifiedKFold
+from sklearn.preprocessing import StandardScaler
+from threadpoolctl import threadpool_limits
+
+from src.customer_features import FEATURE_COLUMNS
+from src.model_bundle import MODEL_DIR, data_fingerprint
+from src.model_train import load_customer_features, training_matrix
+from src.store import CACHE_DIR
+
+FOLDS_DIR = os.path.join(CACHE_DIR, 'cv_folds')
+LEADERBOARD_PATH = os.path.join(MODEL_DIR, 'search_leaderboard.csv')
+
+C_GRID = [0.01, 0.1, 1.0, 10.0, 100.0]
+CLASS_WEIGHTS = [None, 'balanced']
+# Recency defines the target (PurchasedAgain = Recency <= 30), so the
+# subsets without it show how much signal the other features carry
+FEATURE_SUBSETS = {
+    'all': FEATURE_COLUMNS,
+    'rfm': ['Recency', 'Frequency', 'Monetary'],
+    'no_recency': [c for c in FEATURE_COLUMNS if c not in ('Recency', 'LastMonthSpend')],
+    'value': ['Monetary', 'AOV', 'NumOrders', 'UniqueProducts', 'TotalQuantity'],
+}
+
+
+def training_data(raw_path=None):
+    """
+    (X, y) for the propensity model from model_train.py's own helpers, plus
+    TotalQuantity for the 'value' subset. y is a NumPy array.
+    """
+    X, y = training_matrix(load_customer_features(raw_path), FEATURE_COLUMNS + ['TotalQuantity'])
+    return X, y.to_numpy()
+
+
+def cache_folds(X, y, n_folds=5, seed=42, folds_dir=FOLDS_DIR):
+    """
+    Splits (X, y) into stratified folds and saves each fold's train/validation
+    matrices - scaled with a StandardScaler fitted on that fold's training
+    part - as .npy files. Keyed by the data fingerprint, so a later search on
+    the same data reuses them. Returns the fold directory.
+
+    Every feature is scaled independently, so one scaled matrix per fold
+    serves all feature subsets (columns are selected afterwards).
+    """
+    key = f"{data_fingerprint(X)[:16]}-k{n_folds}-s{seed}"
+    fold_dir = os.path.join(folds_dir, key)
+    if os.path.exists(os.path.join(fold_dir, 'columns.txt')):
+        return fold_dir
+
+    tmp_dir = fold_dir + '.tmp'
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    os.makedirs(tmp_dir)
+    values = X.to_numpy(dtype='float64')
+    splitter = StratifiedKFold(n_splits=n_folds, shuffle=True, random_state=seed)
+    for i, (train_idx, val_idx) in enumerate(splitter.split(values, y)):
+        scaler = StandardScaler().fit(values[train_idx])
+        np.save(os.path.join(tmp_dir, f'fold{i}_X_train.npy'), scaler.transform(values[train_idx]))
+        np.save(os.path.join(tmp_dir, f'fold{i}_X_val.npy'), scaler.transform(values[val_idx]))
+        np.save(os.path.join(tmp_dir, f'fold{i}_y_train.npy'), y[train_idx])
+        np.save(os.path.join(tmp_dir, f'fold{i}_y_val.npy'), y[val_idx])
+    # written last: its presence marks a complete fold cache
+    with open(os.path.join(tmp_dir, 'columns.txt'), 'w') as f:
+        f.write('\n'.join(X.columns))
+    shutil.rmtree(fold_dir, ignore_errors=True)
+    os.replace(tmp_dir, fold_dir)
+    return fold_dir
+
+
+def candidates(c_grid=C_GRID, class_weights=CLASS_WEIGHTS, subsets=FEATURE_SUBSETS):
+    return [
+        {'features': name, 'C': c, 'class_weight': weight}
+        for name, c, weight in itertools.product(subsets, c_grid, class_weights)
+    ]
+
+
+def _init_worker():
+    # one BLAS thread per process; the pool already uses every core
+    threadpool_limits(1)
+
+
+def evaluate_fold(fold_dir, fold, candidate, columns):
+    """Fits one candidate on one cached fold. Runs in a worker process."""
+    def load(name):
+        return np.load(os.path.join(fold_dir, f'fold{fold}_{name}.npy'), mmap_mode='r')
+
+    idx = [columns.index(c) for c in FEATURE_SUBSETS[candidate['features']]]
+    X_train, X_val = load('X_train')[:, idx], load('X_val')[:, idx]
+    y_train, y_val = load('y_train'), load('y_val')
+
+    start = time.perf_counter()
+    model = LogisticRegression(C=candidate['C'], class_weight=candidate['class_weight'], max_iter=1000)
+    model.fit(X_train, y_train)
+    fit_seconds = time.perf_counter() - start
+
+    proba = model.predict_proba(X_val)[:, 1]
+    pred = model.classes_[(proba > 0.5).astype(int)]
+    return {
+        'roc_auc': roc_auc_score(y_val, proba),
+        'log_loss': log_loss(y_val, proba, labels=[0, 1]),
+        'accuracy': accuracy_score(y_val, pred),
+        'f1': f1_score(y_val, pred, zero_division=0),
+        'fit_seconds': fit_seconds,
+        'eval_seconds': time.perf_counter() - start,
+    }
+
+
+def run_search(fold_dir, candidate_list, n_folds=5, max_workers=None):
+    """
+    Evaluates every (candidate, fold) pair in a process pool and returns the
+    leaderboard, best mean ROC-AUC first.
+    """
+    with open(os.path.join(fold_dir, 'columns.txt')) as f:
+        columns = f.read().split('\n')
+
+    tasks = [(i, fold) for i in range(len(candidate_list)) for fold in range(n_folds)]
+    with ProcessPoolExecutor(max_workers=max_workers, initializer=_init_worker) as pool:
+        futures = [pool.submit(evaluate_fold, fold_dir, fold, candidate_list[i], columns) for i, fold in tasks]
+        results = [future.result() for future in futures]
+
+    scores = pd.DataFrame(results)
+    scores['candidate'] = [i for i, _ in tasks]
+    summary = scores.groupby('candidate').agg(
+        roc_auc_mean=('roc_auc', 'mean'),
+        roc_auc_std=('roc_auc', 'std'),
+        log_loss_mean=('log_loss', 'mean'),
+        accuracy_mean=('accuracy', 'mean'),
+        f1_mean=('f1', 'mean'),
+        fit_seconds_mean=('fit_seconds', 'mean'),
+        cpu_seconds=('eval_seconds', 'sum'),
+    )
+    board = pd.DataFrame(candidate_list).join(summary)
+    board['class_weight'] = board['class_weight'].fillna('none')
+    board = board.sort_values(['roc_auc_mean', 'log_loss_mean'], ascending=[False, True]).reset_index(drop=True)
+    board.insert(0, 'rank', np.arange(1, len(board) + 1))
+    return board
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Parallel cross-validated hyperparameter search")
+    parser.add_argument('--raw', default=None, help="raw OnlineRetail file (default: data/OnlineRetail.xlsx, else .csv)")
+    parser.add_argument('--folds', type=int, default=5)
+    parser.add_argument('--workers', type=int, default=None, help="worker processes (default: all cores)")
+    parser.add_argument('--C', type=float, nargs='+', default=C_GRID, help="regularization strengths to try")
+    parser.add_argument('--subsets', nargs='+', default=list(FEATURE_SUBSETS), choices=list(FEATURE_SUBSETS))
+    parser.add_argument('--out', default=LEADERBOARD_PATH)
+    args = parser.parse_args()
+
+    total_start = time.perf_counter()
+    print("📦 Building training data...")
+    X, y = training_data(args.raw)
+    print(f"✅ {len(X):,} customers, {y.mean():.1%} positive")
+
+    start = time.perf_counter()
+    fold_dir = cache_folds(X, y, args.folds)
+    print(f"💾 Scaled fold matrices ready in {time.perf_counter() - start:.2f}s: {fold_dir}")
+
+    candidate_list = candidates(args.C, CLASS_WEIGHTS, {name: FEATURE_SUBSETS[name] for name in args.subsets})
+    workers = args.workers or os.cpu_count()
+    print(f"🚀 Evaluating {len(candidate_list)} candidates x {args.folds} folds on {workers} workers...")
+    start = time.perf_counter()
+    board = run_search(fold_dir, candidate_list, args.folds, workers)
+    search_seconds = time.perf_counter() - start
+
+    os.makedirs(os.path.dirname(args.out) or '.', exist_ok=True)
+    board.to_csv(args.out, index=False)
+    print(board.head(10).to_string(index=False))
+    print(f"⏱️ Search: {search_seconds:.2f}s wall, {board['cpu_seconds'].sum():.2f}s of fold work; "
+          f"total {time.perf_counter() - total_start:.2f}s")
+    print(f"📊 Leaderboard saved at: {args.out}")
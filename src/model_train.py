@@ -1,4 +1,3 @@
-import pandas as pd
 import numpy as np
 from sklearn.model_selection import train_test_split
 from sklearn.preprocessing import StandardScaler
@@ -6,137 +5,129 @@ from sklearn.linear_model import LogisticRegression
 from sklearn.metrics import classification_report, confusion_matrix
 import joblib
 import os
+import matplotlib
+matplotlib.use("Agg")
 import matplotlib.pyplot as plt
 
-# 1️⃣ Load and Clean Data
-print("📦 Loading dataset...")
-df = pd.read_excel('data/OnlineRetail.xlsx', engine='openpyxl')
-
-# Drop rows with missing CustomerID
-df = df.dropna(subset=['CustomerID'])
-
-# Convert date column
-df['InvoiceDate'] = pd.to_datetime(df['InvoiceDate'])
-
-# Create TotalPrice
-df['TotalPrice'] = df['Quantity'] * df['UnitPrice']
-
-print("✅ Data loaded and cleaned.")
-
-# 2️⃣ Create Enhanced Customer Features (RFM + More)
-print("⚙️ Creating enhanced customer features...")
-snapshot_date = df['InvoiceDate'].max() + pd.Timedelta(days=1)
-
-# Base grouping
-customer_features = df.groupby('CustomerID').agg({
-    'InvoiceDate': [
-        lambda x: (snapshot_date - x.max()).days,  # Recency
-        lambda x: (x.max() - x.min()).days,        # Customer Tenure
-        'count'                                   # Frequency (# of purchases)
-    ],
-    'TotalPrice': 'sum',                          # Monetary (total spend)
-    'StockCode': pd.Series.nunique,               # Unique products
-    'InvoiceNo': pd.Series.nunique,               # Number of orders
-    'Quantity': 'sum'                             # Total quantity
-})
-
-# Rename columns
-customer_features.columns = [
-    'Recency', 'CustomerTenure', 'Frequency', 'Monetary',
-    'UniqueProducts', 'NumOrders', 'TotalQuantity'
-]
-
-# Average Order Value
-customer_features['AOV'] = customer_features['Monetary'] / customer_features['NumOrders']
-
-# Average Basket Size
-customer_features['AvgBasketSize'] = customer_features['TotalQuantity'] / customer_features['NumOrders']
-
-# Country (region)
-country_data = df.groupby('CustomerID')['Country'].first()
-customer_features = customer_features.merge(country_data, on='CustomerID', how='left')
-
-# Average Purchase Interval (avg days between orders)
-purchase_intervals = (
-    df.groupby('CustomerID')['InvoiceDate']
-    .apply(lambda x: x.sort_values().diff().dt.days.mean())
-    .fillna(0)
-)
-customer_features['AvgPurchaseInterval'] = purchase_intervals
-
-# Last Month Spend (total spend in last 30 days)
-last_month_cutoff = snapshot_date - pd.Timedelta(days=30)
-last_month_spend = df[df['InvoiceDate'] > last_month_cutoff].groupby('CustomerID')['TotalPrice'].sum()
-customer_features['LastMonthSpend'] = customer_features.index.map(last_month_spend).fillna(0)
-
-# Return Rate (% of cancelled orders)
-returns = df[df['InvoiceNo'].astype(str).str.startswith('C')].groupby('CustomerID')['InvoiceNo'].count()
-total_orders = df.groupby('CustomerID')['InvoiceNo'].count()
-return_rate = (returns / total_orders).fillna(0)
-customer_features['ReturnRate'] = customer_features.index.map(return_rate)
-
-# Define Target: PurchasedAgain (Recency <= 30)
-customer_features['PurchasedAgain'] = np.where(customer_features['Recency'] <= 30, 1, 0)
-
-print("✅ Enhanced customer features created successfully!")
-print(customer_features.head())
+from src.customer_features import FEATURE_COLUMNS, build_customer_features
+from src.model_bundle import MODEL_DIR, fused_path, save_bundle
+from src.store import load_transactions
+
+BUNDLE_PATH = os.path.join(MODEL_DIR, "propensity_bundle.joblib")
+PLOT_PATH = os.path.join(MODEL_DIR, "feature_importance.png")
+# legacy model/scaler pair, still read by predict_helper when there is no bundle
+MODEL_PATH = os.path.join(MODEL_DIR, "logistic_model.joblib")
+SCALER_PATH = os.path.join(MODEL_DIR, "scaler.joblib")
+
+
+# 1️⃣ Load and Clean Data + 2️⃣ Create Enhanced Customer Features (RFM + More)
+def load_customer_features(raw_path=None):
+    # raw_path=None: the project's data/OnlineRetail.xlsx, else .csv (store.default_raw_path)
+    df = load_transactions(raw_path=raw_path)
+
+    # Drop rows with missing CustomerID
+    df = df.dropna(subset=['CustomerID'])
+
+    # Create TotalPrice
+    df['TotalPrice'] = df['Quantity'] * df['UnitPrice']
+
+    customer_features = build_customer_features(df)
+
+    # Define Target: PurchasedAgain (Recency <= 30)
+    customer_features['PurchasedAgain'] = np.where(customer_features['Recency'] <= 30, 1, 0)
+    return customer_features
+
 
 # 3️⃣ Prepare Data for Modeling
-# Drop non-numeric columns (Country will be encoded later)
-X = customer_features[[
-    'Recency', 'CustomerTenure', 'Frequency', 'Monetary', 'UniqueProducts',
-    'NumOrders', 'AOV', 'AvgBasketSize', 'AvgPurchaseInterval',
-    'LastMonthSpend', 'ReturnRate'
-]]
+def training_matrix(customer_features, columns=FEATURE_COLUMNS):
+    # Drop non-numeric columns (Country will be encoded later)
+    X = customer_features[columns]
 
-y = customer_features['PurchasedAgain']
+    y = customer_features['PurchasedAgain']
 
-# Handle missing / infinite values
-X = X.replace([np.inf, -np.inf], np.nan)
-X = X.fillna(0)
+    # Handle missing / infinite values
+    X = X.replace([np.inf, -np.inf], np.nan)
+    X = X.fillna(0)
+    return X, y
 
-# Scale features
-scaler = StandardScaler()
-X_scaled = scaler.fit_transform(X)
 
-# Train-test split
-X_train, X_test, y_train, y_test = train_test_split(
-    X_scaled, y, test_size=0.3, random_state=42, stratify=y
-)
+def split(X_scaled, y):
+    # Train-test split (fixed seed, so evaluation can rebuild the same holdout)
+    return train_test_split(X_scaled, y, test_size=0.3, random_state=42, stratify=y)
+
 
 # 4️⃣ Train Model
-print("🚀 Training logistic regression model...")
-model = LogisticRegression(max_iter=1000)
-model.fit(X_train, y_train)
-print("✅ Model training completed!")
+def train(X, y):
+    """
+    Fits the scaler and the logistic regression.
+    Returns (model, scaler, X_test, y_test) with X_test already scaled.
+    """
+    # Scale features
+    scaler = StandardScaler()
+    X_scaled = scaler.fit_transform(X)
+
+    X_train, X_test, y_train, y_test = split(X_scaled, y)
+
+    model = LogisticRegression(max_iter=1000)
+    model.fit(X_train, y_train)
+    return model, scaler, X_test, y_test
+
 
 # 5️⃣ Evaluate Model
-y_pred = model.predict(X_test)
-print("\n✅ Classification Report:")
-print(classification_report(y_test, y_pred))
-print("✅ Confusion Matrix:")
-print(confusion_matrix(y_test, y_pred))
+def evaluate(model, X_test, y_test):
+    y_pred = model.predict(X_test)
+    return classification_report(y_test, y_pred), confusion_matrix(y_test, y_pred)
+
 
 # 6️⃣ Feature Importance Visualization
-coef = model.coef_[0]
-features = X.columns
-plt.figure(figsize=(10,6))
-plt.barh(features, coef)
-plt.title("Feature Importance (Logistic Regression Coefficients)")
-plt.xlabel("Coefficient Value")
-plt.ylabel("Feature")
-plt.tight_layout()
-
-# Save plot instead of showing
-os.makedirs("model", exist_ok=True)
-plt.savefig("model/feature_importance.png")
-plt.close()
-print("📊 Feature importance plot saved at: model/feature_importance.png")
+def plot_feature_importance(model, features, path=PLOT_PATH):
+    coef = model.coef_[0]
+    plt.figure(figsize=(10,6))
+    plt.barh(features, coef)
+    plt.title("Feature Importance (Logistic Regression Coefficients)")
+    plt.xlabel("Coefficient Value")
+    plt.ylabel("Feature")
+    plt.tight_layout()
 
-# 7️⃣ Save Model and Scaler
-joblib.dump(model, "model/logistic_model.joblib")
-joblib.dump(scaler, "model/scaler.joblib")
+    # Save plot instead of showing
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    plt.savefig(path, format="png")
+    plt.close()
 
-print("✅ Model saved successfully at: model/logistic_model.joblib")
-print("✅ Scaler saved successfully at: model/scaler.joblib")
-print("🎉 Training complete! Your enhanced predictive model is ready.")
+
+# 7️⃣ Save Model and Scaler
+def save_model(model, scaler, X, bundle_path=BUNDLE_PATH):
+    os.makedirs(MODEL_DIR, exist_ok=True)
+    joblib.dump(model, MODEL_PATH)
+    joblib.dump(scaler, SCALER_PATH)
+    return save_bundle(bundle_path, model, scaler, X)
+
+
+if __name__ == "__main__":
+    print("📦 Loading dataset...")
+    print("⚙️ Creating enhanced customer features...")
+    customer_features = load_customer_features()
+    print("✅ Enhanced customer features created successfully!")
+    print(customer_features.head())
+
+    X, y = training_matrix(customer_features)
+
+    print("🚀 Training logistic regression model...")
+    model, scaler, X_test, y_test = train(X, y)
+    print("✅ Model training completed!")
+
+    report, matrix = evaluate(model, X_test, y_test)
+    print("\n✅ Classification Report:")
+    print(report)
+    print("✅ Confusion Matrix:")
+    print(matrix)
+
+    plot_feature_importance(model, X.columns)
+    print(f"📊 Feature importance plot saved at: {PLOT_PATH}")
+
+    bundle = save_model(model, scaler, X)
+    print(f"✅ Model saved successfully at: {MODEL_PATH}")
+    print(f"✅ Scaler saved successfully at: {SCALER_PATH}")
+    print(f"✅ Model bundle {bundle.version} saved at: {BUNDLE_PATH}")
+    print(f"✅ Fused NumPy model saved at: {fused_path(BUNDLE_PATH)}")
+    print("🎉 Training complete! Your enhanced predictive model is ready.")
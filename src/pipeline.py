@@ -0,0 +1,234 @@
+# src/pipeline.py
+import os
+import json
+import time
+import argparse
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+import pandas as pd
+from sklearn.metrics import classification_report, confusion_matrix, roc_auc_score
+
+from src.artifacts import ensure_artifact, is_fresh
+from src.model_bundle import MODEL_DIR, fused_path
+from src.store import CACHE_DIR, build_store, default_raw_path
+
+PIPELINE_DIR = os.path.join(CACHE_DIR, 'pipeline')
+CLEAN_PATH = os.path.join(PIPELINE_DIR, 'clean_retail.parquet')
+RFM_PATH = os.path.join(PIPELINE_DIR, 'rfm_labeled.parquet')
+FEATURES_PATH = os.path.join(PIPELINE_DIR, 'customer_features.parquet')
+SCORES_PATH = os.path.join(PIPELINE_DIR, 'customer_scores.parquet')
+RFM_BUNDLE_PATH = os.path.join(MODEL_DIR, 'rfm_bundle.joblib')
+PROPENSITY_BUNDLE_PATH = os.path.join(MODEL_DIR, 'propensity_bundle.joblib')
+# not model/feature_importance.png: that one is tracked, written by python -m src.model_train
+PLOT_PATH = os.path.join(PIPELINE_DIR, 'feature_importance.png')
+EVALUATION_PATH = os.path.join(MODEL_DIR, 'evaluation.json')
+
+
+# Each build function writes its artifact to `tmp_path`, and nothing else;
+# ensure_artifact moves it into place. Inputs are read from the upstream
+# artifacts, never from CSV.
+
+def build_clean(tmp_path, config):
+    from src.data_preprocess import clean_data, load_data
+    clean_data(load_data(config['raw_path'])).to_parquet(tmp_path, index=False)
+
+
+def build_rfm(tmp_path, config):
+    from src.features import create_rfm_panel
+    df = pd.read_parquet(CLEAN_PATH)
+    window = config['label_window_days']
+    # default cutoff: the last date whose label window is complete
+    cutoff = config['cutoff'] or df['InvoiceDate'].max().normalize() - pd.Timedelta(days=window)
+    # single-cutoff create_rfm + create_label, in one sorted pass
+    rfm = create_rfm_panel(df, [cutoff], window).drop(columns='CutoffDate')
+    rfm.to_parquet(tmp_path, index=False)
+
+
+def build_customer_features(tmp_path, config):
+    from src.model_train import load_customer_features
+    load_customer_features(config['raw_path']).to_parquet(tmp_path)
+
+
+def build_train_rfm(tmp_path, config):
+    from src.model import train_model
+    # the fused kernel is its own stage (fuse_rfm)
+    train_model(RFM_PATH, bundle_path=tmp_path, fused=False)
+
+
+def build_train_propensity(tmp_path, config):
+    from src.model_bundle import save_bundle
+    from src.model_train import train, training_matrix
+    X, y = training_matrix(pd.read_parquet(FEATURES_PATH))
+    model, scaler, _, _ = train(X, y)
+    # the bundle only (not save_model's legacy logistic_model/scaler joblibs;
+    # the fused kernel is its own stage)
+    save_bundle(tmp_path, model, scaler, X, fused=False)
+
+
+def build_fused_rfm(tmp_path, config):
+    from src.model_bundle import ModelBundle
+    ModelBundle.load(RFM_BUNDLE_PATH).fused.save(tmp_path)
+
+
+def build_fused_propensity(tmp_path, config):
+    from src.model_bundle import ModelBundle
+    ModelBundle.load(PROPENSITY_BUNDLE_PATH).fused.save(tmp_path)
+
+
+def build_importance_plot(tmp_path, config):
+    from src.model_bundle import ModelBundle
+    from src.model_train import plot_feature_importance
+    bundle = ModelBundle.load(PROPENSITY_BUNDLE_PATH)
+    plot_feature_importance(bundle.model, bundle.feature_names, tmp_path)
+
+
+def build_evaluation(tmp_path, config):
+    from src.model_bundle import ModelBundle
+    from src.model_train import split, training_matrix
+    bundle = ModelBundle.load(PROPENSITY_BUNDLE_PATH)
+    X, y = training_matrix(pd.read_parquet(FEATURES_PATH))
+    # same seeded holdout the model was trained without
+    _, X_test, _, y_test = split(bundle.scaler.transform(X), y)
+    y_pred = bundle.model.predict(X_test)
+    report = {
+        'model_version': bundle.version,
+        'roc_auc': float(roc_auc_score(y_test, bundle.model.predict_proba(X_test)[:, 1])),
+        'classification_report': classification_report(y_test, y_pred, output_dict=True),
+        'confusion_matrix': confusion_matrix(y_test, y_pred).tolist(),
+    }
+    with open(tmp_path, 'w') as f:
+        json.dump(report, f, indent=2)
+
+
+def build_scores(tmp_path, config):
+    from src.model_bundle import ModelBundle
+    bundle = ModelBundle.load(PROPENSITY_BUNDLE_PATH)
+    features = pd.read_parquet(FEATURES_PATH)
+    probabilities, predictions = bundle.predict(
+        features[bundle.feature_names].replace([float('inf'), float('-inf')], float('nan')).fillna(0)
+    )
+    pd.DataFrame({
+        'CustomerID': features.index.to_numpy(),
+        'Probability': probabilities,
+        'Prediction': predictions,
+    }).to_parquet(tmp_path, index=False)
+
+
+class Stage:
+    """
+    One pipeline step: the artifact it writes, the stages whose artifacts it
+    reads (`deps`), whether it reads the raw file, and the config keys that
+    change its output. `version` is bumped when the build code changes.
+    """
+
+    def __init__(self, name, output, build, deps=(), raw=False, params=(), version=1):
+        self.name = name
+        self.output = output
+        self.build = build
+        self.deps = list(deps)
+        self.raw = raw
+        self.params = list(params)
+        self.version = f'pipeline-{name}-v{version}'
+
+    def sources(self, config):
+        inputs = [config['raw_path']] if self.raw else []
+        return inputs + [STAGES[dep].output for dep in self.deps]
+
+    def stage_params(self, config):
+        return {key: config[key] for key in self.params}
+
+
+STAGES = {stage.name: stage for stage in [
+    Stage('clean', CLEAN_PATH, build_clean, raw=True),
+    Stage('rfm', RFM_PATH, build_rfm, deps=['clean'], params=['cutoff', 'label_window_days']),
+    Stage('train_rfm', RFM_BUNDLE_PATH, build_train_rfm, deps=['rfm']),
+    Stage('fuse_rfm', fused_path(RFM_BUNDLE_PATH), build_fused_rfm, deps=['train_rfm']),
+    Stage('features', FEATURES_PATH, build_customer_features, raw=True),
+    Stage('train', PROPENSITY_BUNDLE_PATH, build_train_propensity, deps=['features']),
+    Stage('fuse', fused_path(PROPENSITY_BUNDLE_PATH), build_fused_propensity, deps=['train']),
+    Stage('plot', PLOT_PATH, build_importance_plot, deps=['train']),
+    Stage('evaluate', EVALUATION_PATH, build_evaluation, deps=['train', 'features']),
+    Stage('score', SCORES_PATH, build_scores, deps=['train', 'features']),
+]}
+
+
+def _with_deps(targets):
+    # targets plus everything they depend on, in declaration order
+    needed = set()
+    stack = list(targets)
+    while stack:
+        name = stack.pop()
+        if name not in needed:
+            needed.add(name)
+            stack.extend(STAGES[name].deps)
+    return [name for name in STAGES if name in needed]
+
+
+def run_stage(name, config, force=False):
+    """Builds one stage if its inputs, params or code changed. Runs in a worker process."""
+    stage = STAGES[name]
+    sources, params = stage.sources(config), stage.stage_params(config)
+    if not force and is_fresh(stage.output, sources, stage.version, params):
+        return {'stage': name, 'status': 'skipped', 'seconds': 0.0}
+    start = time.perf_counter()
+    ensure_artifact(stage.output, sources, stage.version,
+                    lambda tmp_path: stage.build(tmp_path, config), params, force=True)
+    return {'stage': name, 'status': 'built', 'seconds': round(time.perf_counter() - start, 3)}
+
+
+def run_pipeline(targets=None, raw_path=None, cutoff=None, label_window_days=30, force=False, max_workers=None):
+    """
+    Runs the requested stages (default: all) and their dependencies. A stage
+    starts as soon as its dependencies are done, so independent stages
+    (the RFM and propensity branches; plot, evaluate and score) run in
+    parallel. Stages whose artifact is still fresh are skipped, and an
+    upstream rebuild that produces identical content does not invalidate
+    the stages below it (freshness is checked on content hashes).
+    """
+    config = {
+        'raw_path': raw_path or default_raw_path(),
+        'cutoff': str(cutoff) if cutoff else None,
+        'label_window_days': label_window_days,
+    }
+    os.makedirs(PIPELINE_DIR, exist_ok=True)
+    # the shared transaction store is built once here, not raced by parallel stages
+    build_store(config['raw_path'])
+    needed = _with_deps(targets or list(STAGES))
+    done, running, results = set(), {}, []
+
+    with ProcessPoolExecutor(max_workers=max_workers) as pool:
+        while len(done) < len(needed):
+            for name in needed:
+                if name not in done and name not in running and all(dep in done for dep in STAGES[name].deps):
+                    running[name] = pool.submit(run_stage, name, config, force)
+            finished, _ = wait(running.values(), return_when=FIRST_COMPLETED)
+            for name, future in list(running.items()):
+                if future in finished:
+                    result = future.result()
+                    icon = '✅' if result['status'] == 'built' else '⏭️'
+                    print(f"{icon} {name}: {result['status']} ({result['seconds']:.2f}s) -> {STAGES[name].output}")
+                    results.append(result)
+                    done.add(name)
+                    del running[name]
+    return pd.DataFrame(results)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="preprocess -> features -> train -> score, rebuilding only what changed")
+    parser.add_argument('stages', nargs='*',
+                        help=f"stages to bring up to date, with their dependencies (default: all of {', '.join(STAGES)})")
+    parser.add_argument('--raw', default=None, help="raw transactions file (default: data/OnlineRetail.*)")
+    parser.add_argument('--cutoff', default=None, help="RFM cutoff date (default: last date with a full label window)")
+    parser.add_argument('--label-window-days', type=int, default=30)
+    parser.add_argument('--force', action='store_true', help="rebuild even if fresh")
+    parser.add_argument('--workers', type=int, default=None, help="parallel stages (default: all cores)")
+    args = parser.parse_args()
+    unknown = [name for name in args.stages if name not in STAGES]
+    if unknown:
+        parser.error(f"unknown stage(s) {unknown}; choose from {list(STAGES)}")
+
+    start = time.perf_counter()
+    results = run_pipeline(args.stages, args.raw, args.cutoff, args.label_window_days, args.force, args.workers)
+    built = (results['status'] == 'built').sum()
+    print(f"🎉 Pipeline done in {time.perf_counter() - start:.2f}s: "
+          f"{built} stage(s) built, {len(results) - built} up to date.")
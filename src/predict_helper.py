@@ -1,12 +1,165 @@
 # src/predict_helper.py
+import os
+import threading
 import joblib
 import numpy as np
+import pandas as pd
+from scipy.special import expit
 
-model = joblib.load('model/logistic_model.joblib')
-scaler = joblib.load('model/scaler.joblib')
+from src.fused_model import FusedLogit
+from src.model_bundle import MODEL_DIR, HotBundle, ModelBundle, fused_path
+
+# rows scored per vectorized call in predict_many
+BATCH_SIZE = 100_000
+
+RFM_FEATURES = ['Recency', 'Frequency', 'Monetary']
+
+class ModelRegistry:
+    """
+    Serves the current ModelBundle, loading it on first use (not at import).
+
+    Reads `bundle_path` when it exists - hot-reloadable via refresh()/watch() -
+    and otherwise falls back to the legacy logistic_model/scaler joblib pair.
+    `fused` comes from the kernel exported next to the bundle when there is
+    one, so per-event scoring never unpickles sklearn objects. Paths resolve
+    against the project, not the working directory. Large arrays are
+    memory-mapped, and all threads share the one loaded copy.
+    """
+
+    def __init__(self, bundle_path=None, model_path=None, scaler_path=None):
+        self.bundle_path = os.path.abspath(bundle_path or os.path.join(MODEL_DIR, 'propensity_bundle.joblib'))
+        self.model_path = os.path.abspath(model_path or os.path.join(MODEL_DIR, 'logistic_model.joblib'))
+        self.scaler_path = os.path.abspath(scaler_path or os.path.join(MODEL_DIR, 'scaler.joblib'))
+        self.fused_path = fused_path(self.bundle_path)
+        self._hot = HotBundle(self.bundle_path)
+        self._hot_fused = HotBundle(self.fused_path, load=FusedLogit.load)
+        self._lock = threading.Lock()
+        self._legacy = None
+
+    def _legacy_bundle(self):
+        bundle = self._legacy
+        if bundle is None:
+            with self._lock:
+                # another thread may have finished loading while we waited
+                if self._legacy is None:
+                    model = joblib.load(self.model_path, mmap_mode='r')
+                    scaler = joblib.load(self.scaler_path, mmap_mode='r')
+                    # older artifacts did not record their inputs; those were RFM models
+                    names = getattr(scaler, 'feature_names_in_', RFM_FEATURES)
+                    self._legacy = ModelBundle(model, scaler, names, version='legacy')
+                bundle = self._legacy
+        return bundle
+
+    @property
+    def bundle(self):
+        """The current bundle. Take it once per unit of work so a swap can't split it."""
+        if os.path.exists(self.bundle_path):
+            return self._hot.current
+        return self._legacy_bundle()
+
+    @property
+    def model(self):
+        return self.bundle.model
+
+    @property
+    def scaler(self):
+        return self.bundle.scaler
+
+    @property
+    def fused(self):
+        """The current FusedLogit. Take it once per unit of work, like `bundle`."""
+        if os.path.exists(self.fused_path):
+            return self._hot_fused.current
+        # no exported kernel (legacy artifacts): derived from the bundle
+        return self.bundle.fused
+
+    def refresh(self):
+        """Swaps in the bundle / kernel files that changed on disk. Returns True on a swap."""
+        swapped = os.path.exists(self.fused_path) and self._hot_fused.refresh()
+        return (os.path.exists(self.bundle_path) and self._hot.refresh()) or swapped
+
+    def watch(self, poll_interval=2.0):
+        """Polls the bundle and kernel files from background threads and swaps in new versions."""
+        self._hot.watch(poll_interval)
+        self._hot_fused.watch(poll_interval)
+
+    def reload(self):
+        """Drops the loaded artifacts; the next access reads them from disk again."""
+        with self._lock:
+            self._legacy = None
+        if os.path.exists(self.bundle_path):
+            self._hot.refresh(force=True)
+        if os.path.exists(self.fused_path):
+            self._hot_fused.refresh(force=True)
+
+# the 11-feature propensity model (model_train.py) and the RFM model (model.py)
+registry = ModelRegistry()
+rfm_registry = ModelRegistry(bundle_path=os.path.join(MODEL_DIR, 'rfm_bundle.joblib'))
+
+def __getattr__(name):
+    # keeps `predict_helper.model` / `.scaler` working without loading at import time
+    if name in ('model', 'scaler'):
+        return getattr(registry, name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 def predict_one(recency, frequency, monetary):
-    x = scaler.transform([[recency, frequency, monetary]])
-    prob = model.predict_proba(x)[0,1]
-    pred = model.predict(x)[0]
+    fused = rfm_registry.fused
+    if fused.feature_names != RFM_FEATURES:
+        raise ValueError(
+            f"predict_one needs a model trained on {RFM_FEATURES}, not {fused.feature_names}; "
+            f"`python -m src.model` writes one to {rfm_registry.bundle_path}"
+        )
+    pred, prob = fused.predict_one([recency, frequency, monetary])
     return pred, prob
+
+def predict_fast(rows, fused=None):
+    """
+    Scores raw feature rows (2-D array, feature_names() order) with the fused
+    NumPy kernel (`fused`, default: the current one). Returns (probabilities,
+    predictions); matches sklearn to floating-point rounding.
+    """
+    fused = fused or registry.fused
+    X = np.atleast_2d(np.asarray(rows, dtype='float64'))
+    if X.shape[1] != len(fused.weights):
+        raise ValueError(f"model {fused.version} expects {len(fused.weights)} features "
+                         f"{fused.feature_names}, got {X.shape[1]}")
+    return fused.predict(X)
+
+def feature_names():
+    """Input columns, in order, that the current model expects."""
+    return list(registry.fused.feature_names)
+
+def predict_many(data, id_column='CustomerID', batch_size=BATCH_SIZE):
+    """
+    Scores many customers at once.
+
+    `data` is a DataFrame holding the feature_names() columns (plus `id_column`
+    if present) or a 2-D array with the features in that order.
+    The decision function is computed once per batch; the probability is its
+    sigmoid and the label is its sign, exactly like predict_proba / predict.
+    Returns a DataFrame with CustomerID, Probability and Prediction.
+    """
+    bundle = registry.bundle
+    model, scaler, names = bundle.model, bundle.scaler, bundle.feature_names
+    if isinstance(data, pd.DataFrame):
+        X = bundle.select(data)
+        if id_column in data.columns:
+            ids = data[id_column].to_numpy()
+        else:
+            ids = data.index.to_numpy()
+    else:
+        X = bundle.select(np.asarray(data, dtype='float64').reshape(-1, len(names)))
+        ids = np.arange(len(X))
+
+    scores = np.empty(len(X))
+    for start in range(0, len(X), batch_size):
+        batch = X[start:start + batch_size]
+        if hasattr(scaler, 'feature_names_in_'):
+            batch = pd.DataFrame(batch, columns=names)
+        scores[start:start + batch_size] = model.decision_function(scaler.transform(batch))
+
+    return pd.DataFrame({
+        'CustomerID': ids,
+        'Probability': expit(scores),
+        'Prediction': model.classes_[(scores > 0).astype(int)],
+    })
@@ -0,0 +1,110 @@
+# src/rfm.py
+import os
+
+import numpy as np
+import pandas as pd
+
+from src.artifacts import ensure_artifact, is_fresh
+from src.schema import is_cancelled
+from src.store import CACHE_DIR, build_store, default_raw_path, load_transactions
+
+RFM_VERSION = 'rfm-v1'
+RFM_DIR = os.path.join(CACHE_DIR, 'rfm')
+
+COLUMNS = ['InvoiceNo', 'Quantity', 'InvoiceDate', 'UnitPrice', 'CustomerID']
+
+# RFM_Score (3..12) -> segment; index = score
+SEGMENTS = ['Champions', 'Active', 'At Risk', 'Lost']
+SEGMENT_LOOKUP = np.array(['Lost'] * 5 + ['At Risk'] * 2 + ['Active'] * 3 + ['Champions'] * 3)
+
+
+def rfm_paths(raw_path=None):
+    raw_path = raw_path or default_raw_path()
+    base = os.path.join(RFM_DIR, os.path.basename(raw_path))
+    return {
+        'scores': os.path.join(base, 'rfm_scores.parquet'),
+        'segments': os.path.join(base, 'rfm_segments.parquet'),
+    }
+
+
+def compute_rfm(df, snapshot_date=None):
+    """
+    Recency / Frequency / Monetary per customer from sales lines
+    (CustomerID present, not cancelled, Quantity and UnitPrice > 0).
+    Recency is in days from the last purchase to `snapshot_date`
+    (default: the day after the last invoice), like features.create_rfm.
+    """
+    sales = df[df['CustomerID'].notna() & ~is_cancelled(df['InvoiceNo'])
+               & (df['Quantity'] > 0) & (df['UnitPrice'] > 0)]
+    if snapshot_date is None:
+        snapshot_date = sales['InvoiceDate'].max().normalize() + pd.Timedelta(days=1)
+
+    grouped = sales.assign(Spend=sales['Quantity'] * sales['UnitPrice']).groupby('CustomerID', observed=True)
+    rfm = grouped.agg(
+        LastPurchase=('InvoiceDate', 'max'),
+        Frequency=('InvoiceNo', 'nunique'),
+        Monetary=('Spend', 'sum'),
+    )
+    rfm.insert(0, 'Recency', (pd.Timestamp(snapshot_date) - rfm.pop('LastPurchase')).dt.days)
+    return rfm.reset_index()
+
+
+def quantile_scores(values, n_bins=4, reverse=False):
+    """
+    1..n_bins quantile score per value, like pd.qcut(values, n_bins,
+    labels=1..n) but as one np.quantile + np.searchsorted. Bins are right-closed;
+    tied edges collapse (no crash on skewed data - those scores are skipped).
+    `reverse` gives the lowest values the highest score (for recency).
+    """
+    values = np.asarray(values, dtype='float64')
+    edges = np.quantile(values, np.linspace(0, 1, n_bins + 1)[1:-1])
+    scores = np.searchsorted(edges, values, side='left') + 1
+    return n_bins + 1 - scores if reverse else scores
+
+
+def score_rfm(rfm):
+    """Adds R/F/M scores, RFM_Score and Segment (looked up, not per-row) to a compute_rfm frame."""
+    scored = rfm.copy()
+    scored['R_Score'] = quantile_scores(rfm['Recency'], reverse=True)
+    scored['F_Score'] = quantile_scores(rfm['Frequency'])
+    scored['M_Score'] = quantile_scores(rfm['Monetary'])
+    scored['RFM_Score'] = scored['R_Score'] + scored['F_Score'] + scored['M_Score']
+    scored['Segment'] = pd.Categorical(SEGMENT_LOOKUP[scored['RFM_Score']], categories=SEGMENTS)
+    return scored
+
+
+def segment_table(scored):
+    """One row per segment: customer count, average R/F/M and total revenue."""
+    table = scored.groupby('Segment', observed=False).agg(
+        Count=('CustomerID', 'size'),
+        AvgRecency=('Recency', 'mean'),
+        AvgFrequency=('Frequency', 'mean'),
+        AvgMonetary=('Monetary', 'mean'),
+        Revenue=('Monetary', 'sum'),
+    )
+    table['Share'] = table['Count'] / max(len(scored), 1)
+    return table.reset_index()
+
+
+def ensure_rfm(raw_path=None, force=False):
+    """
+    Materializes the scored customers and the segment table for the current
+    dataset version (the transaction store) and returns their paths. Both are
+    rebuilt only when the raw data or RFM_VERSION changes.
+    """
+    raw_path = raw_path or default_raw_path()
+    store_path = build_store(raw_path)
+    paths = rfm_paths(raw_path)
+    if force or not all(is_fresh(path, [store_path], RFM_VERSION) for path in paths.values()):
+        scored = score_rfm(compute_rfm(load_transactions(COLUMNS, raw_path=raw_path)))
+        ensure_artifact(paths['scores'], [store_path], RFM_VERSION,
+                        lambda tmp_path: scored.to_parquet(tmp_path, index=False), force=True)
+        ensure_artifact(paths['segments'], [store_path], RFM_VERSION,
+                        lambda tmp_path: segment_table(scored).to_parquet(tmp_path, index=False), force=True)
+    return paths
+
+
+if __name__ == "__main__":
+    paths = ensure_rfm(force=True)
+    print(pd.read_parquet(paths['segments']).to_string(index=False))
+    print(f"✅ RFM scores saved at: {paths['scores']}")
@@ -0,0 +1,115 @@
+# src/rollups.py
+import os
+
+import pandas as pd
+
+from src.artifacts import ensure_artifact, is_fresh
+from src.schema import is_cancelled
+from src.store import CACHE_DIR, build_store, default_raw_path, load_transactions
+from src.time_index import slice_sorted
+
+ROLLUPS_VERSION = 'rollups-v1'
+ROLLUPS_DIR = os.path.join(CACHE_DIR, 'rollups')
+
+# name -> grouping keys. `cube` is the full day x country x product grain; the
+# smaller ones are its projections for charts that don't need every dimension.
+# Rollups come out sorted by their keys, so the dated ones are sorted by Date.
+ROLLUPS = {
+    'cube': ['Date', 'Country', 'Description'],
+    'day_country': ['Date', 'Country'],
+    'product': ['Description'],
+}
+
+# Measures in every rollup:
+#   Revenue         sum of Quantity * UnitPrice over all lines (returns included)
+#   SalesRevenue    the same over sales lines only (Quantity > 0 and UnitPrice > 0)
+#   Quantity        net units
+#   ReturnQuantity  units on cancelled invoices (negative)
+#   ReturnLines     lines on cancelled invoices
+#   Lines           invoice lines
+#   Invoices        distinct invoices
+# Everything but Invoices is additive, so any rollup can be re-aggregated from
+# the cube; distinct invoice counts are not (an invoice spans products), which
+# is why each rollup is built from the transactions with its own exact count.
+MEASURES = ['Revenue', 'SalesRevenue', 'Quantity', 'ReturnQuantity', 'ReturnLines', 'Lines', 'Invoices']
+
+COLUMNS = ['InvoiceNo', 'Description', 'Quantity', 'InvoiceDate', 'UnitPrice', 'Country']
+
+
+def rollup_path(name, raw_path=None):
+    raw_path = raw_path or default_raw_path()
+    return os.path.join(ROLLUPS_DIR, os.path.basename(raw_path), f'{name}.parquet')
+
+
+def _prepare(df):
+    # per-line measures + the time keys, computed once for all rollups
+    total = df['Quantity'] * df['UnitPrice']
+    returned = is_cancelled(df['InvoiceNo'])
+    return pd.DataFrame({
+        'Date': df['InvoiceDate'].dt.normalize(),
+        'Country': df['Country'],
+        'Description': df['Description'],
+        'InvoiceNo': df['InvoiceNo'],
+        'Revenue': total,
+        'SalesRevenue': total.where((df['Quantity'] > 0) & (df['UnitPrice'] > 0), 0.0),
+        'Quantity': df['Quantity'].astype('int64'),
+        'ReturnQuantity': df['Quantity'].where(returned, 0).astype('int64'),
+        'ReturnLines': returned.astype('int64'),
+    })
+
+
+def aggregate(lines, keys):
+    """One rollup of the prepared lines: MEASURES per distinct combination of `keys`."""
+    grouped = lines.groupby(keys, observed=True)
+    out = grouped[['Revenue', 'SalesRevenue', 'Quantity', 'ReturnQuantity', 'ReturnLines']].sum()
+    out['Lines'] = grouped.size()
+    out['Invoices'] = grouped['InvoiceNo'].nunique()
+    return out.reset_index()
+
+
+def ensure_rollups(raw_path=None, force=False):
+    """
+    Materializes every rollup next to the transaction store and returns
+    {name: path}. Rollups are rebuilt only when the store changed (new raw
+    data) or ROLLUPS_VERSION was bumped; the transactions are read once
+    for all rollups that need rebuilding.
+    """
+    raw_path = raw_path or default_raw_path()
+    store_path = build_store(raw_path)
+    paths = {name: rollup_path(name, raw_path) for name in ROLLUPS}
+    stale = [name for name in ROLLUPS if force or not is_fresh(paths[name], [store_path], ROLLUPS_VERSION)]
+    if stale:
+        lines = _prepare(load_transactions(COLUMNS, raw_path=raw_path))
+        for name in stale:
+            ensure_artifact(
+                paths[name], [store_path], ROLLUPS_VERSION,
+                lambda tmp_path: aggregate(lines, ROLLUPS[name]).to_parquet(tmp_path, index=False),
+                force=True,
+            )
+    return paths
+
+
+def load_rollup(name, raw_path=None):
+    """Reads one rollup (building the rollups first if needed)."""
+    return pd.read_parquet(ensure_rollups(raw_path)[name])
+
+
+def filter_rollup(rollup, start=None, end=None, countries=None):
+    """
+    Rows of a dated rollup inside the day range start..end (binary search on
+    its sorted Date) and, if given, in `countries` (only the date slice is
+    scanned for those).
+    """
+    rows = slice_sorted(rollup, 'Date', start, end)
+    if countries:
+        rows = rows[rows['Country'].isin(countries)]
+    return rows
+
+
+if __name__ == "__main__":
+    import time
+    start = time.perf_counter()
+    paths = ensure_rollups(force=True)
+    print(f"✅ Rollups built in {time.perf_counter() - start:.2f}s")
+    for name, path in paths.items():
+        print(f"   {name}: {len(pd.read_parquet(path)):,} rows -> {path}")
@@ -0,0 +1,72 @@
+# src/schema.py
+import numpy as np
+import pandas as pd
+
+# Bump whenever the schema below changes, so stores built with the old one are rebuilt
+SCHEMA_VERSION = 1
+
+# Low-cardinality text columns -> dictionary encoded (int codes + one copy of each string)
+CATEGORICAL_COLUMNS = ['InvoiceNo', 'StockCode', 'Description', 'Country']
+
+# Numeric columns -> smallest dtype that holds the OnlineRetail ranges.
+# UnitPrice stays float64 so money totals add up exactly as before.
+NUMERIC_DTYPES = {
+    'Quantity': 'int32',
+    'UnitPrice': 'float64',
+    'CustomerID': 'Int32',   # nullable, ~25% of rows have no customer
+}
+
+# InvoiceDate is parsed once and kept as int64 epoch milliseconds (datetime64[ms]),
+# which is also the unit Parquet stores it in.
+DATE_COLUMNS = {
+    'InvoiceDate': 'datetime64[ms]',
+}
+
+
+def apply_schema(df):
+    """
+    Casts a transactions DataFrame to the compact schema above.
+    Columns that are missing are skipped and already-typed columns are left alone;
+    when every column already has its dtype (data coming out of the store), `df`
+    itself is returned without a copy. Otherwise the result is a new frame that
+    shares the untouched columns with `df`.
+    """
+    categorical = [col for col in CATEGORICAL_COLUMNS
+                   if col in df.columns and not isinstance(df[col].dtype, pd.CategoricalDtype)]
+    numeric = {col: dtype for col, dtype in NUMERIC_DTYPES.items() if col in df.columns and df[col].dtype != dtype}
+    dates = {col: dtype for col, dtype in DATE_COLUMNS.items() if col in df.columns and df[col].dtype != dtype}
+    if not (categorical or numeric or dates):
+        return df
+
+    df = df.copy(deep=False)
+    for col in categorical:
+        # Excel gives a mix of ints and strings for InvoiceNo/StockCode
+        df[col] = df[col].astype('string').astype('category')
+
+    for col, dtype in numeric.items():
+        df[col] = df[col].astype(dtype)
+
+    for col, dtype in dates.items():
+        df[col] = pd.to_datetime(df[col], errors='coerce').astype(dtype)
+
+    return df
+
+
+def is_cancelled(invoice_no):
+    """
+    Boolean mask of cancelled invoices (InvoiceNo starting with 'C').
+    On a categorical column the check runs once per distinct invoice, not per row.
+    """
+    if isinstance(invoice_no.dtype, pd.CategoricalDtype):
+        flags = invoice_no.cat.categories.astype(str).str.startswith('C')
+        codes = invoice_no.cat.codes.to_numpy()
+        mask = np.where(codes >= 0, np.asarray(flags)[codes], False)
+        return pd.Series(mask, index=invoice_no.index)
+    return invoice_no.astype(str).str.startswith('C')
+
+
+def memory_usage_mb(df):
+    """
+    Deep memory footprint of a DataFrame in MB.
+    """
+    return df.memory_usage(deep=True).sum() / 1024 ** 2
@@ -0,0 +1,263 @@
+# src/scoring_service.py
+import argparse
+import asyncio
+import json
+import time
+from collections import deque
+from http import HTTPStatus
+
+import numpy as np
+
+from src import predict_helper
+
+
+class MicroBatcher:
+    """
+    Collects concurrent single-customer requests and scores them together.
+
+    A batch is flushed once it holds `max_batch_size` rows or the oldest
+    request has waited `max_wait_ms`, whichever comes first, so one vectorized
+    call of the fused NumPy kernel (predict_fast) serves many requests within
+    a bounded latency budget.
+    """
+
+    def __init__(self, max_batch_size=64, max_wait_ms=5.0, latency_window=10_000):
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+        self._queue = asyncio.Queue()
+        self._worker = None
+        self.started_at = time.perf_counter()
+        self.requests = 0
+        self.batches = 0
+        self.errors = 0
+        self.latencies_ms = deque(maxlen=latency_window)
+        self.batch_sizes = deque(maxlen=latency_window)
+
+    def start(self):
+        self._worker = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self):
+        if self._worker is not None:
+            self._worker.cancel()
+            try:
+                await self._worker
+            except asyncio.CancelledError:
+                pass
+
+    async def score(self, features):
+        """
+        Queues one request's features (by name, or a list in feature order) and
+        waits for its (probability, prediction). Invalid features raise
+        ValueError / KeyError / TypeError.
+        """
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((features, future, time.perf_counter()))
+        return await future
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self._queue.get()]
+            deadline = loop.time() + self.max_wait
+            while len(batch) < self.max_batch_size:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+
+            # one model per batch: features are ordered and checked against the
+            # same kernel that scores them, even if a new one was swapped in since
+            fused = predict_helper.registry.fused
+            valid, rows = [], []
+            for item in batch:
+                try:
+                    rows.append(_parse_features(item[0], fused.feature_names))
+                    valid.append(item)
+                except (ValueError, KeyError, TypeError) as e:
+                    if not item[1].done():
+                        item[1].set_exception(e)
+            batch = valid
+            if not batch:
+                continue
+
+            try:
+                # scoring runs off the event loop so sockets keep being served
+                probabilities, predictions = await loop.run_in_executor(
+                    None, predict_helper.predict_fast, np.array(rows, dtype='float64'), fused)
+            except Exception as e:
+                self.errors += len(batch)
+                for _, future, _ in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+
+            now = time.perf_counter()
+            self.batches += 1
+            self.batch_sizes.append(len(batch))
+            for (_, future, queued_at), prob, pred in zip(batch, probabilities, predictions):
+                self.requests += 1
+                self.latencies_ms.append((now - queued_at) * 1000)
+                if not future.done():
+                    future.set_result((float(prob), int(pred)))
+
+    def stats(self):
+        uptime = time.perf_counter() - self.started_at
+        latencies = np.asarray(self.latencies_ms) if self.latencies_ms else np.zeros(1)
+        return {
+            'uptime_s': round(uptime, 1),
+            'requests': self.requests,
+            'errors': self.errors,
+            'batches': self.batches,
+            'throughput_rps': round(self.requests / uptime, 1) if uptime else 0.0,
+            'avg_batch_size': round(float(np.mean(self.batch_sizes)), 2) if self.batch_sizes else 0.0,
+            'latency_ms': {
+                'p50': round(float(np.percentile(latencies, 50)), 3),
+                'p95': round(float(np.percentile(latencies, 95)), 3),
+                'p99': round(float(np.percentile(latencies, 99)), 3),
+                'max': round(float(latencies.max()), 3),
+            },
+            'max_batch_size': self.max_batch_size,
+            'max_wait_ms': self.max_wait * 1000,
+        }
+
+
+def _parse_features(features, names):
+    # {"Recency": 10, ...} or [10, ...] in the order of `names` (the scoring model's features)
+    if isinstance(features, dict):
+        return [float(features[name]) for name in names]
+    if len(features) != len(names):
+        raise ValueError(f"expected {len(names)} features: {names}")
+    return [float(value) for value in features]
+
+
+class ScoringServer:
+    """
+    Minimal HTTP/1.1 server (keep-alive, JSON bodies) on top of asyncio streams.
+
+      POST /score  {"CustomerID": 12346, "features": {...}} -> probability + prediction
+      GET  /stats  throughput, batch size and latency percentiles
+      GET  /health liveness check + loaded model version
+    """
+
+    def __init__(self, host='127.0.0.1', port=8000, max_batch_size=64, max_wait_ms=5.0, reload_interval=2.0):
+        self.host = host
+        self.port = port
+        self.reload_interval = reload_interval
+        self.batcher = MicroBatcher(max_batch_size=max_batch_size, max_wait_ms=max_wait_ms)
+        self._server = None
+
+    async def start(self):
+        # load the model before accepting traffic, not on the first request
+        predict_helper.feature_names()
+        if self.reload_interval:
+            # a retrained bundle is swapped in between batches; a batch already
+            # being scored keeps the bundle it started with
+            predict_helper.registry.watch(self.reload_interval)
+        self.batcher.start()
+        self._server = await asyncio.start_server(self._handle_connection, self.host, self.port)
+        self.port = self._server.sockets[0].getsockname()[1]
+        return self
+
+    async def stop(self):
+        self._server.close()
+        await self._server.wait_closed()
+        await self.batcher.stop()
+
+    async def serve_forever(self):
+        async with self._server:
+            await self._server.serve_forever()
+
+    async def _handle_connection(self, reader, writer):
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                method, path, _ = request_line.decode('latin1').split(' ', 2)
+
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b'\r\n', b'\n', b''):
+                        break
+                    key, _, value = line.decode('latin1').partition(':')
+                    headers[key.strip().lower()] = value.strip()
+
+                body = b''
+                if int(headers.get('content-length', 0)):
+                    body = await reader.readexactly(int(headers['content-length']))
+
+                status, response = await self._route(method, path, body)
+                keep_alive = headers.get('connection', '').lower() != 'close'
+                self._write_response(writer, status, response, keep_alive)
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError, ValueError):
+            pass
+        finally:
+            writer.close()
+
+    async def _route(self, method, path, body):
+        if path == '/score':
+            if method != 'POST':
+                return HTTPStatus.METHOD_NOT_ALLOWED, {'error': 'use POST'}
+            try:
+                payload = json.loads(body)
+                features = payload['features']
+            except (ValueError, KeyError, TypeError) as e:
+                return HTTPStatus.BAD_REQUEST, {'error': f'bad request: {e}'}
+            try:
+                probability, prediction = await self.batcher.score(features)
+            except (ValueError, KeyError, TypeError) as e:
+                return HTTPStatus.BAD_REQUEST, {'error': f'bad request: {e}'}
+            except Exception as e:
+                return HTTPStatus.INTERNAL_SERVER_ERROR, {'error': str(e)}
+            return HTTPStatus.OK, {
+                'CustomerID': payload.get('CustomerID'),
+                'Probability': probability,
+                'Prediction': prediction,
+            }
+        if path == '/stats' and method == 'GET':
+            return HTTPStatus.OK, self.batcher.stats()
+        if path == '/health' and method == 'GET':
+            fused = predict_helper.registry.fused
+            return HTTPStatus.OK, {'status': 'ok', 'model_version': fused.version, 'features': fused.feature_names}
+        return HTTPStatus.NOT_FOUND, {'error': f'no route for {method} {path}'}
+
+    @staticmethod
+    def _write_response(writer, status, payload, keep_alive):
+        body = json.dumps(payload).encode()
+        writer.write(
+            f"HTTP/1.1 {status.value} {status.phrase}\r\n"
+            f"Content-Type: application/json\r\n"
+            f"Content-Length: {len(body)}\r\n"
+            f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n".encode('latin1') + body
+        )
+
+
+async def _main(args):
+    server = await ScoringServer(args.host, args.port, args.max_batch_size, args.max_wait_ms,
+                                 args.reload_interval).start()
+    print(f"🚀 Scoring service listening on http://{server.host}:{server.port} "
+          f"(batch ≤ {args.max_batch_size}, wait ≤ {args.max_wait_ms} ms)")
+    await server.serve_forever()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Local micro-batching HTTP scoring service")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8000)
+    parser.add_argument('--max-batch-size', type=int, default=64,
+                        help="flush a batch once it holds this many requests")
+    parser.add_argument('--max-wait-ms', type=float, default=5.0,
+                        help="latency budget: longest a request waits for its batch to fill")
+    parser.add_argument('--reload-interval', type=float, default=2.0,
+                        help="seconds between checks for a retrained model bundle (0 disables)")
+    try:
+        asyncio.run(_main(parser.parse_args()))
+    except KeyboardInterrupt:
+        print("👋 Scoring service stopped.")
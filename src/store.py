@@ -0,0 +1,226 @@
+# src/store.py
+import os
+import shutil
+from itertools import islice
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+from openpyxl import load_workbook
+
+from src.artifacts import ensure_artifact
+from src.schema import CATEGORICAL_COLUMNS, SCHEMA_VERSION, apply_schema, memory_usage_mb
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+DATA_DIR = os.path.join(PROJECT_ROOT, 'data')
+CACHE_DIR = os.path.join(DATA_DIR, 'cache')
+
+RAW_XLSX = os.path.join(DATA_DIR, 'OnlineRetail.xlsx')
+RAW_CSV = os.path.join(DATA_DIR, 'OnlineRetail.csv')
+
+# rows per chunk when streaming raw files in and batches out of the store
+DEFAULT_CHUNKSIZE = 250_000
+
+# Bump when the store layout changes, so stores written with the old one are rebuilt.
+# v2: rows are sorted by InvoiceDate (see src/time_index.py)
+STORE_LAYOUT = 2
+
+# row group size of the sorted runs written while building the store
+RUN_ROW_GROUP = 8_192
+
+
+def default_raw_path():
+    """
+    Returns the raw OnlineRetail file to ingest (Excel preferred, then CSV).
+    """
+    if os.path.exists(RAW_XLSX):
+        return RAW_XLSX
+    return RAW_CSV
+
+
+def iter_raw(path, chunksize=DEFAULT_CHUNKSIZE):
+    """
+    Parses a raw OnlineRetail export (.xlsx or .csv) into chunks of at most
+    `chunksize` rows with the compact schema. This is the slow path -
+    consumers should go through load_transactions / iter_transactions.
+    """
+    if not os.path.exists(path):
+        raise FileNotFoundError(f"❌ File not found: {path}")
+
+    if path.endswith('.xlsx'):
+        chunks = _iter_xlsx(path, chunksize)
+    else:
+        chunks = pd.read_csv(path, encoding='latin1', chunksize=chunksize)
+
+    for chunk in chunks:
+        yield apply_schema(chunk)
+
+
+def _iter_xlsx(path, chunksize):
+    # read-only mode streams the sheet XML row by row instead of building the
+    # whole workbook in memory like pd.read_excel does
+    workbook = load_workbook(path, read_only=True, data_only=True)
+    try:
+        rows = workbook.worksheets[0].iter_rows(values_only=True)
+        header = [str(name) for name in next(rows)]
+        while True:
+            batch = list(islice(rows, chunksize))
+            if not batch:
+                break
+            yield pd.DataFrame.from_records(batch, columns=header).dropna(how='all')
+    finally:
+        workbook.close()
+
+
+def _to_arrow(chunk):
+    # categorical code width depends on the chunk, so write plain strings and
+    # let Parquet's own dictionary encoding compress them
+    chunk = chunk.astype({col: 'string' for col in CATEGORICAL_COLUMNS if col in chunk.columns})
+    return pa.Table.from_pandas(chunk, preserve_index=False)
+
+
+def _read_dictionary(columns):
+    return [col for col in CATEGORICAL_COLUMNS if columns is None or col in columns]
+
+
+def store_path_for(raw_path):
+    """
+    Location of the columnar copy of a raw file inside data/cache.
+    """
+    return os.path.join(CACHE_DIR, os.path.basename(raw_path) + '.parquet')
+
+
+def _date_keys(table):
+    # InvoiceDate as int64 epoch ms; missing dates sort last, like Arrow's sort
+    dates = table.column('InvoiceDate').cast(pa.timestamp('ms')).cast(pa.int64())
+    return dates.fill_null(np.iinfo('int64').max).to_numpy()
+
+
+def _last_key(table):
+    return _date_keys(table.slice(len(table) - 1))[0]
+
+
+def _write_sorted_runs(raw_path, runs_dir):
+    """
+    Writes each raw chunk, sorted by InvoiceDate, to its own Parquet file
+    ("run") under `runs_dir`. Returns (run paths in file order, schema).
+    """
+    os.makedirs(runs_dir, exist_ok=True)
+    paths, schema = [], None
+    for i, chunk in enumerate(iter_raw(raw_path)):
+        table = _to_arrow(chunk)
+        schema = schema or table.schema
+        path = os.path.join(runs_dir, f'run-{i:05d}.parquet')
+        # small row groups: the merge reads a run one row group at a time
+        pq.write_table(table.cast(schema).sort_by('InvoiceDate'), path, row_group_size=RUN_ROW_GROUP)
+        paths.append(path)
+    return paths, schema
+
+
+def _merge_runs(paths, schema, out_path, chunksize=DEFAULT_CHUNKSIZE):
+    """
+    K-way merges date-sorted runs into one date-sorted Parquet file, holding
+    about `chunksize` rows in memory. Each step emits every buffered row
+    older than the smallest "newest buffered date" across the runs that
+    still have unread rows - no unread row can sort before those - and then
+    refills the run(s) that set that limit. Ties are emitted in run order, so
+    the merge is stable with respect to the raw file order.
+    """
+    batch_size = max(1, chunksize // max(len(paths), 1))
+    readers = [pq.ParquetFile(path).iter_batches(batch_size=batch_size) for path in paths]
+    buffers = [pa.Table.from_batches([], schema=schema) for _ in paths]
+    exhausted = [False] * len(paths)
+
+    def refill(i):
+        batch = next(readers[i], None)
+        if batch is None:
+            exhausted[i] = True
+        else:
+            buffers[i] = pa.concat_tables([buffers[i], pa.Table.from_batches([batch])])
+
+    for i in range(len(paths)):
+        refill(i)
+
+    with pq.ParquetWriter(out_path, schema) as writer:
+        pending, pending_rows = [], 0
+        while not all(exhausted) or any(len(buffer) for buffer in buffers):
+            limits = [_last_key(buffer) if len(buffer) else np.iinfo('int64').min
+                      for buffer, done in zip(buffers, exhausted) if not done]
+            cutoff = min(limits) if limits else None
+
+            ready = []
+            for i, buffer in enumerate(buffers):
+                take = len(buffer) if cutoff is None else int(np.searchsorted(_date_keys(buffer), cutoff, side='left'))
+                ready.append(buffer.slice(0, take))
+                buffers[i] = buffer.slice(take)
+            block = pa.concat_tables(ready)
+            if len(block):
+                # runs were concatenated in file order, and the sort is stable
+                pending.append(block.sort_by('InvoiceDate'))
+                pending_rows += len(block)
+            if pending_rows >= chunksize or (all(exhausted) and pending):
+                writer.write_table(pa.concat_tables(pending), row_group_size=chunksize)
+                pending, pending_rows = [], 0
+
+            for i, buffer in enumerate(buffers):
+                if not exhausted[i] and (not len(buffer) or _last_key(buffer) == cutoff):
+                    refill(i)
+        if pending:
+            writer.write_table(pa.concat_tables(pending), row_group_size=chunksize)
+
+
+def build_store(raw_path=None, store_path=None, force=False):
+    """
+    Converts the raw CSV/XLSX into a Parquet file once and returns its path.
+    The rows are sorted by InvoiceDate (stable, so lines with the same
+    timestamp keep their file order), which lets date ranges be read by
+    binary search instead of a scan. The sort is external: each raw chunk is
+    sorted into its own run and the runs are merged, so building the store
+    never holds more than a few chunks in memory.
+    The Parquet copy is reused until the raw file's content, the schema or
+    STORE_LAYOUT changes.
+    """
+    raw_path = raw_path or default_raw_path()
+    store_path = store_path or store_path_for(raw_path)
+
+    def build(tmp_path):
+        runs_dir = tmp_path + '.runs'
+        try:
+            paths, schema = _write_sorted_runs(raw_path, runs_dir)
+            if not paths:
+                raise ValueError(f"❌ No transactions found in: {raw_path}")
+            _merge_runs(paths, schema, tmp_path)
+        finally:
+            shutil.rmtree(runs_dir, ignore_errors=True)
+
+    version = f'schema-v{SCHEMA_VERSION}-layout-v{STORE_LAYOUT}'
+    return ensure_artifact(store_path, [raw_path], version, build, force=force)
+
+
+def load_transactions(columns=None, raw_path=None):
+    """
+    Reads the transaction store, building it first if needed.
+    Pass `columns` to only read the columns a page actually uses.
+    """
+    path = build_store(raw_path)
+    table = pq.read_table(path, columns=columns, read_dictionary=_read_dictionary(columns))
+    return apply_schema(table.to_pandas())
+
+
+def iter_transactions(columns=None, raw_path=None, chunksize=DEFAULT_CHUNKSIZE):
+    """
+    Streams the transaction store in chunks of at most `chunksize` rows,
+    for consumers whose input does not fit in memory.
+    """
+    path = build_store(raw_path)
+    store = pq.ParquetFile(path, read_dictionary=_read_dictionary(columns))
+    for batch in store.iter_batches(batch_size=chunksize, columns=columns):
+        yield apply_schema(batch.to_pandas())
+
+
+if __name__ == "__main__":
+    path = build_store(force=True)
+    df = load_transactions()
+    print(f"✅ Transaction store written to: {path}")
+    print(f"📦 {len(df):,} rows, {memory_usage_mb(df):.1f} MB in memory")
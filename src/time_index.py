@@ -0,0 +1,161 @@
+# src/time_index.py
+import os
+
+import numpy as np
+import pandas as pd
+import pyarrow.parquet as pq
+
+from src.artifacts import ensure_artifact
+from src.store import build_store, default_raw_path, store_path_for
+
+INDEX_VERSION = 'time-index-v1'
+
+# NaT rows sort past every real date, so no date range ever selects them
+_NO_DATE = np.iinfo('int64').max
+
+
+def date_bounds(start=None, end=None):
+    """
+    [lo, hi) Timestamps of the inclusive day range start..end; a missing
+    bound is open.
+    """
+    lo = pd.Timestamp(start).normalize() if start is not None else pd.Timestamp.min
+    hi = pd.Timestamp(end).normalize() + pd.Timedelta(days=1) if end is not None else pd.Timestamp.max
+    return lo, hi
+
+
+def slice_sorted(frame, column, start=None, end=None):
+    """
+    Rows of `frame` whose `column` falls inside the day range start..end.
+    `frame` must be sorted by `column`: the range is two binary searches and
+    a slice, not a boolean mask over every row.
+    """
+    if start is None and end is None:
+        return frame
+    lo, hi = date_bounds(start, end)
+    values = frame[column].to_numpy()
+    first, last = np.searchsorted(values, np.array([lo, hi], dtype=values.dtype), side='left')
+    return frame.iloc[first:last]
+
+
+class TimeIndex:
+    """
+    Row index over the date-sorted transaction store (see store.build_store).
+
+    `dates` holds every row's InvoiceDate (epoch ms, ascending), so a date
+    range is a slice found by binary search. Rows are also partitioned by
+    country: `order` lists the row positions of each country's partition
+    back to back (in date order inside each partition, starting at
+    `offsets[i]`), so a country + date filter is one binary search per
+    selected country instead of a scan over all rows.
+    """
+
+    def __init__(self, dates, countries, order, offsets):
+        self.dates = dates
+        self.countries = list(countries)
+        self.order = order
+        self.offsets = offsets
+        self.country_dates = dates[order]
+        self._position = {name: i for i, name in enumerate(self.countries)}
+
+    @classmethod
+    def from_frame(cls, df):
+        """Builds the index of `df` (InvoiceDate and categorical Country, in store order)."""
+        dates = df['InvoiceDate'].to_numpy(dtype='datetime64[ms]')
+        dates = np.where(np.isnat(dates), _NO_DATE, dates.astype('int64'))
+        codes = df['Country'].cat.codes.to_numpy(dtype='int64')
+        # stable: each partition keeps the store's date order (rows without a country sort first, unused)
+        order = np.argsort(codes, kind='stable')
+        offsets = np.searchsorted(codes[order], np.arange(len(df['Country'].cat.categories) + 1))
+        return cls(dates, df['Country'].cat.categories.astype(str), order, offsets)
+
+    def _bounds(self, start, end):
+        # epoch ms, like self.dates
+        lo, hi = date_bounds(start, end)
+        return (lo.value // 1_000_000 if start is not None else np.iinfo('int64').min,
+                hi.value // 1_000_000 if end is not None else _NO_DATE)
+
+    def rows(self, start=None, end=None, countries=None):
+        """
+        Store rows inside the day range start..end and, if `countries` is
+        given, in those countries. Returns a slice without a country filter,
+        otherwise a sorted array of row positions.
+        """
+        lo, hi = self._bounds(start, end)
+        if not countries:
+            first, last = np.searchsorted(self.dates, [lo, hi], side='left')
+            return slice(int(first), int(last))
+
+        parts = []
+        for name in countries:
+            i = self._position.get(name)
+            if i is None:
+                continue
+            begin, stop = self.offsets[i], self.offsets[i + 1]
+            first, last = np.searchsorted(self.country_dates[begin:stop], [lo, hi], side='left')
+            parts.append(self.order[begin + first:begin + last])
+        return np.sort(np.concatenate(parts)) if parts else np.empty(0, dtype='int64')
+
+    def count(self, start=None, end=None, countries=None):
+        rows = self.rows(start, end, countries)
+        return rows.stop - rows.start if isinstance(rows, slice) else len(rows)
+
+    def select(self, df, start=None, end=None, countries=None):
+        """The rows of `df` (the store, in store order) that match the filters."""
+        return df.iloc[self.rows(start, end, countries)]
+
+    def save(self, path):
+        # a file object, so np.savez doesn't append .npz to the temp path
+        with open(path, 'wb') as f:
+            np.savez(f, dates=self.dates, countries=np.array(self.countries, dtype=str),
+                     order=self.order, offsets=self.offsets)
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path, allow_pickle=False) as data:
+            return cls(data['dates'], data['countries'].tolist(), data['order'], data['offsets'])
+
+
+def index_path_for(raw_path):
+    return os.path.splitext(store_path_for(raw_path))[0] + '.index.npz'
+
+
+def ensure_time_index(raw_path=None, force=False):
+    """
+    Builds the TimeIndex of the transaction store next to it, once per
+    store build, and returns its path.
+    """
+    raw_path = raw_path or default_raw_path()
+    store_path = build_store(raw_path)
+
+    def build(tmp_path):
+        columns = pq.read_table(store_path, columns=['InvoiceDate', 'Country'], read_dictionary=['Country']).to_pandas()
+        TimeIndex.from_frame(columns).save(tmp_path)
+
+    return ensure_artifact(index_path_for(raw_path), [store_path], INDEX_VERSION, build, force=force)
+
+
+def load_time_index(raw_path=None):
+    return TimeIndex.load(ensure_time_index(raw_path))
+
+
+if __name__ == "__main__":
+    import time
+    from src.store import load_transactions
+
+    index = load_time_index()
+    df = load_transactions(['InvoiceDate', 'Country'])
+    end = df['InvoiceDate'].max()
+    start = end - pd.Timedelta(days=30)
+    countries = df['Country'].value_counts().index[:3].tolist()
+
+    begin = time.perf_counter()
+    rows = index.rows(start, end, countries)
+    indexed = time.perf_counter() - begin
+    begin = time.perf_counter()
+    mask = (df['InvoiceDate'] >= start.normalize()) & (df['InvoiceDate'] < end.normalize() + pd.Timedelta(days=1)) \
+        & df['Country'].isin(countries)
+    scanned = time.perf_counter() - begin
+    assert np.array_equal(rows, np.flatnonzero(mask.to_numpy()))
+    print(f"✅ Last 30 days x {countries}: {len(rows):,} of {len(df):,} rows "
+          f"(index {indexed * 1000:.2f} ms, full scan {scanned * 1000:.2f} ms)")